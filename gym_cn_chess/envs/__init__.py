@@ -1 +1,4 @@
 from .cn_chess_env import CnChessEnv
+from .cn_chess_book import OpeningBook, OpeningBookWrapper
+from .cn_chess_tablebase import Tablebase, build_tablebase
+from .cn_chess_vector import CnChessVectorEnv
@@ -0,0 +1,168 @@
+# 开局库
+# 从棋谱构建按局面哈希排序的 (局面哈希, 动作, 权重) 表，保存为 .npy 文件，
+# 使用时以 mmap 方式打开，多个进程共享同一份操作系统页缓存，不会各自复制一份。
+
+import hashlib
+from typing import Iterable, Optional, Sequence, Union
+
+import gymnasium as gym
+import numpy as np
+
+from .cn_chess_logic import Position, initial, square_cord
+from .cn_chess_env import CnChessEnv
+
+# 开局库条目：局面哈希、动作编号 (0 ~ 8099)、权重 (出现次数)
+book_dtype = np.dtype([("key", "<u8"), ("action", "<u2"), ("weight", "<u4")])
+
+
+def position_hash(position: Union[Position, str]) -> int:
+    """
+    计算局面的 64 位哈希
+    与 python 内置 hash 不同，结果不随进程变化，可以写入文件
+    """
+    board = position.board if isinstance(position, Position) else position
+    return int.from_bytes(hashlib.blake2b(board.encode(), digest_size=8).digest(), "little")
+
+
+class OpeningBook:
+    """
+    开局库，entries 为按 key 排序的 book_dtype 数组 (通常是 np.memmap)
+    """
+
+    index_step = 1024
+    
+    def __init__(self, entries: np.ndarray):
+        if entries.dtype != book_dtype:
+            raise ValueError(f"entries dtype {entries.dtype} not recognized")
+        self.entries = entries
+        # 结构化数组的字段视图，不会复制数据；转为 ndarray 避免 np.memmap 切片的额外开销
+        self.keys = entries["key"].view(np.ndarray)
+        self._actions = entries["action"].view(np.ndarray)
+        self._weights = entries["weight"].view(np.ndarray)
+        # 字段视图不连续，np.searchsorted 会先复制整个数组，
+        # 所以先在每 index_step 个取一个的稀疏索引上查找，再在对应的小块上查找
+        self._index = np.ascontiguousarray(self.keys[::self.index_step])
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path: str) -> "OpeningBook":
+        """
+        以只读 mmap 方式打开开局库文件
+        """
+        return cls(np.load(path, mmap_mode="r"))
+
+    @classmethod
+    def build(cls,
+              games: Iterable[Sequence[Union[int, str]]],
+              path: str,
+              max_ply: int = 20,
+              min_weight: int = 1) -> "OpeningBook":
+        """
+        从棋谱构建开局库并写入 path (没有 .npy 后缀时自动补上)
+
+        games: 每局棋为一个走法序列，走法可以是动作编号，也可以是 CnChessEnv 使用的
+               当前行棋方视角的走法字符串 (例如 h2e2)
+               含不合法走法的棋谱整局跳过
+        max_ply: 每局只收录前 max_ply 步
+        min_weight: 出现次数少于 min_weight 的条目会被丢弃
+        """
+        counts = {}
+        for game in games:
+            # 整局棋的走法都合法时才收录
+            game_keys = []
+            pos = Position(initial)
+            for ply, move in enumerate(game):
+                if ply >= max_ply:
+                    break
+                try:
+                    action = move if isinstance(move, (int, np.integer)) else CnChessEnv.move_to_action(move)
+                except RuntimeError:
+                    game_keys = None
+                    break
+                action = int(action)
+                if not 0 <= action < 90 * 90:
+                    game_keys = None
+                    break
+                from_act, to_act = divmod(action, 90)
+                cords = (square_cord[from_act], square_cord[to_act])
+                if cords not in pos.gen_moves():
+                    game_keys = None
+                    break
+                game_keys.append((position_hash(pos), action))
+                pos = pos.move(cords)
+            for key in game_keys or ():
+                counts[key] = counts.get(key, 0) + 1
+
+        entries = np.array(
+            [(key, action, weight) for (key, action), weight in counts.items() if weight >= min_weight],
+            dtype=book_dtype,
+        )
+        entries.sort(order=["key", "action"])
+        # np.save 会自动补上 .npy 后缀
+        if not str(path).endswith(".npy"):
+            path = f"{path}.npy"
+        np.save(path, entries)
+        return cls.load(path)
+
+    def probe(self, position: Union[Position, str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        查找局面对应的所有条目，返回 (动作数组, 权重数组)
+        在稀疏索引和 mmap 的一小块上二分查找，复杂度 O(log n)
+        """
+        key = np.uint64(position_hash(position))
+        step = self.index_step
+        start = max(int(self._index.searchsorted(key, side="left")) - 1, 0) * step
+        end = min(int(self._index.searchsorted(key, side="right")) * step, len(self.keys))
+        block = self.keys[start:end]
+        lo = start + int(block.searchsorted(key, side="left"))
+        hi = start + int(block.searchsorted(key, side="right"))
+        return self._actions[lo:hi].astype(np.int64), self._weights[lo:hi].astype(np.int64)
+
+    def book_move(self,
+                  position: Union[Position, str],
+                  rng: Optional[np.random.Generator] = None) -> Optional[int]:
+        """
+        返回开局库中的走法，局面不在库中时返回 None
+        rng 为 None 时选择权重最大的走法，否则按权重随机选择
+        """
+        actions, weights = self.probe(position)
+        if len(actions) == 0:
+            return None
+        if rng is None:
+            return int(actions[np.argmax(weights)])
+        return int(rng.choice(actions, p=weights / weights.sum()))
+
+
+class OpeningBookWrapper(gym.Wrapper):
+    """
+    reset 之后自动按开局库走棋，直到局面离开开局库或达到 max_plies
+    info["book_plies"] 记录自动走过的步数
+    """
+
+    def __init__(self, env: gym.Env, book: OpeningBook, max_plies: Optional[int] = None, greedy: bool = False):
+        super().__init__(env)
+        self.book = book
+        self.max_plies = max_plies
+        self.greedy = greedy
+        self._rng = np.random.default_rng()
+
+    def reset(self, *, seed=None, options=None):
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+        observation, info = self.env.reset(seed=seed, options=options)
+
+        plies = 0
+        while self.max_plies is None or plies < self.max_plies:
+            action = self.book.book_move(self.env.unwrapped.pos, None if self.greedy else self._rng)
+            # 局面不在库中，或者哈希冲突导致走法不合法
+            if action is None or not observation["action_mask"][action]:
+                break
+            observation, _, terminated, truncated, info = self.env.step(action)
+            plies += 1
+            if terminated or truncated:
+                break
+
+        info["book_plies"] = plies
+        return observation, info
@@ -0,0 +1,148 @@
+# 棋谱转换为训练数据
+# 逐行读取 ICCS 棋谱，用 Position.move 复盘，不经过 CnChessEnv.step (不生成 action_mask 和 info)，
+# 每个局面生成 (观察, 动作, 结果) 样本，按固定大小写入 .npy 分片。
+# 全程流式处理，内存占用只与分片大小有关，与棋谱数量无关。
+#
+# 棋谱格式: 每行一局，走法为 ICCS (红方视角坐标，例如 h2e2 或 H2-E2)，
+#          行末带结果 1-0 / 0-1 / 1/2-1/2 (红方视角)，空行和 # 开头的行忽略
+#          没有结果或结果为 * (未知) 的对局默认跳过，不当作和棋
+
+import multiprocessing as mp
+import os
+from functools import partial
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+from .cn_chess_logic import Position, initial, cord_square, iccs_to_move
+
+# 样本：观察 (Position.to_numpy 的布局)、动作编号 (行棋方视角)、对局结果 (行棋方视角，1 胜 0 和 -1 负)
+sample_dtype = np.dtype([("observation", "i1", (10, 9)), ("action", "<u2"), ("outcome", "i1")])
+
+# 红方视角的对局结果，* 表示结果未知
+results = {"1-0": 1, "0-1": -1, "1/2-1/2": 0, "*": None}
+
+
+def iter_games(paths: Union[str, Iterable[str]]) -> Iterator[str]:
+    """
+    逐行读取棋谱文件，每次产生一局棋的文本
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+
+def parse_game(line: str) -> tuple[list[str], Optional[int]]:
+    """
+    解析一局棋，返回 (ICCS 走法列表, 红方视角的结果)，结果未知时为 None
+    """
+    tokens = line.split()
+    result = None
+    if tokens and tokens[-1] in results:
+        result = results[tokens.pop()]
+    return [token.replace("-", "").lower() for token in tokens], result
+
+
+def replay_game(line: str, unknown_result: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    复盘一局棋，返回 sample_dtype 数组，每个走法一个样本
+    结果未知时使用 unknown_result，unknown_result 为 None 时返回 None
+    走法不合法时抛出 ValueError
+    """
+    moves, result = parse_game(line)
+    if result is None:
+        if unknown_result is None:
+            return None
+        result = unknown_result
+    samples = np.zeros(len(moves), dtype=sample_dtype)
+    observations, actions = samples["observation"], samples["action"]
+    pos = Position(initial)
+    for ply, move in enumerate(moves):
+        if len(move) != 4:
+            raise ValueError(f"move {move} not recognized")
+        i, j = iccs_to_move(move, ply % 2 == 0)
+        if not pos.board[i].isupper() or (i, j) not in pos.gen_moves():
+            raise ValueError(f"illegal move {move} at ply {ply}")
+        pos.to_numpy(out=observations[ply])
+        actions[ply] = cord_square[i] * 90 + cord_square[j]
+        pos = pos.move((i, j))
+    # 红方在偶数步行棋
+    samples["outcome"][0::2] = result
+    samples["outcome"][1::2] = -result
+    return samples
+
+
+def _replay_or_none(line, unknown_result=None):
+    try:
+        return replay_game(line, unknown_result)
+    except (ValueError, IndexError):
+        return None
+
+
+def iter_samples(games: Iterable[str],
+                 processes: Optional[int] = None,
+                 batch_size: int = 256,
+                 unknown_result: Optional[int] = None) -> Iterator[np.ndarray]:
+    """
+    逐局产生样本数组，不合法的棋谱跳过
+    unknown_result 为结果未知的对局使用的红方视角结果，None 时跳过这些对局
+    processes 为进程池的进程数，None 时在当前进程复盘
+    使用进程池时每次只提交 batch_size 局，内存占用不随棋谱数量增长
+    """
+    games = iter(games)
+    if processes is None:
+        for line in games:
+            samples = _replay_or_none(line, unknown_result)
+            if samples is not None:
+                yield samples
+        return
+    with mp.get_context().Pool(processes) as pool:
+        while True:
+            batch = list(islice(games, batch_size))
+            if not batch:
+                break
+            replay = partial(_replay_or_none, unknown_result=unknown_result)
+            for samples in pool.map(replay, batch, chunksize=max(1, batch_size // (4 * processes))):
+                if samples is not None:
+                    yield samples
+
+
+def write_shards(games: Iterable[str],
+                 directory: str,
+                 shard_size: int = 1 << 16,
+                 processes: Optional[int] = None,
+                 batch_size: int = 256,
+                 unknown_result: Optional[int] = None) -> list[str]:
+    """
+    把棋谱转换为样本并写入 directory/shard_00000.npy, shard_00001.npy, ...
+    每个分片 shard_size 个样本 (最后一个分片可能更少)，可以用 np.load(path, mmap_mode="r") 打开
+    unknown_result 见 iter_samples，返回写入的文件列表
+    """
+    os.makedirs(directory, exist_ok=True)
+    buffer = np.zeros(shard_size, dtype=sample_dtype)
+    filled = 0
+    paths = []
+
+    def flush(n):
+        path = os.path.join(directory, f"shard_{len(paths):05d}.npy")
+        np.save(path, buffer[:n])
+        paths.append(path)
+
+    for samples in iter_samples(games, processes=processes, batch_size=batch_size, unknown_result=unknown_result):
+        while len(samples):
+            n = min(len(samples), shard_size - filled)
+            buffer[filled:filled + n] = samples[:n]
+            samples = samples[n:]
+            filled += n
+            if filled == shard_size:
+                flush(filled)
+                filled = 0
+    if filled:
+        flush(filled)
+    return paths
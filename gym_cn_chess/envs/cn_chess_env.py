@@ -1,25 +1,78 @@
 import numpy as np
 import pygame
-from typing import Any, Tuple, Union, Optional
+from collections.abc import Mapping, Sequence
+from typing import Any, NamedTuple, Tuple, Union, Optional
 import re
-import copy
 import gymnasium as gym
 from gymnasium import spaces
-from .cn_chess_logic import Position, initial, A0
-from .cn_chess_value import get_move_value
+from .cn_chess_logic import Position, initial, A0, square_cord, cord_square
+from .cn_chess_value import get_move_value, get_move_values, get_all_move_values
 from .cn_chess_pygame import CnChessPygame
+from .cn_chess_stats import EnvStats, tic, toc
+
+
+class HistoryView(Sequence):
+    """
+    历史局面的惰性视图，只在访问时创建 Position
+    his 为创建视图时历史局面 (字符串) 的元组，之后的 step / reset 不会改变视图的内容
+    """
+    
+    def __init__(self, his: Tuple[str, ...]):
+        self._his = his
+    
+    def __len__(self):
+        return len(self._his)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Position(board) for board in self._his[index]]
+        return Position(self._his[index])
+
+
+class CnChessState(NamedTuple):
+    """
+    环境状态快照，由 CnChessEnv.get_state 生成，用于 CnChessEnv.set_state 恢复
+    board_count 与环境共享，不要修改；环境修改局面计数前会先复制 (copy-on-write)
+    """
+    board: str
+    current_player: int
+    resigned: Tuple[bool, bool]
+    board_count: Mapping[str, int]
+    history: Tuple[str, ...]
+
+
+def random_opponent(env: "CnChessEnv") -> int:
+    """
+    随机选择一个合法走法
+    """
+    actions = env.get_possible_actions()
+    return int(actions[env.np_random.integers(len(actions))])
+
+
+def greedy_opponent(env: "CnChessEnv") -> int:
+    """
+    选择 get_move_value 最大的走法，价值相同时随机选择
+    """
+    actions = env.get_possible_actions()
+    values = get_move_values(env.pos.board, actions)
+    best = np.flatnonzero(values == values.max())
+    return int(actions[best[env.np_random.integers(len(best))]])
+
+
+opponents = {"random": random_opponent, "greedy": greedy_opponent}
 
 
 class CnChessEnv(gym.Env):
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 4}
     
-    def __init__(self, render_mode=None):
+    def __init__(self, render_mode=None, tablebase=None, stats=False, stats_in_info=False, reuse_buffers=False,
+                 move_values=False, opponent=None):
         # 这定义了缓存的步数，用于存储最近6步的棋局状态。
         # self.cache_steps = 6
         # 初始化棋局状态
         self.pos = Position(initial)
-        # 初始化历史棋局状态
-        self.his = [copy.copy(self.pos.board)]
+        # 初始化历史棋局状态，只保留最近6个局面
+        self.his = [self.pos.board]
         # 创建一个历史记录列表，初始只包含初始棋盘状态的副本，计数= 1
         self.pos_dict = {self.pos.board: 1}
         
@@ -49,12 +102,47 @@ class CnChessEnv(gym.Env):
         # 棋盘计数
         # 用于记录棋局状态出现的次数。这是一个重要的功能，主要用于处理中国象棋中的和棋规则
         self.board_count = {}
+        # board_count 是否与快照共享，共享时修改前需要先复制
+        self._board_count_shared = False
         
         self.window_size = 512  # The size of the PyGame window
         assert render_mode is None or render_mode in self.metadata["render_modes"]
         self.render_mode = render_mode
         self.window = None
         self.clock = None
+        
+        # 残局库 (cn_chess_tablebase.Tablebase)，局面在残局库中时直接判定胜负
+        self.tablebase = tablebase
+        
+        # 当前局面可能的行动缓存 (board, actions)，step 和 generate_observation 共用
+        self._actions_cache = (None, [])
+        
+        # 性能统计，关闭时为 None；stats_in_info 时 info["stats"] 包含本次调用各阶段的耗时
+        self.stats_in_info = stats_in_info
+        self._stats = EnvStats() if stats or stats_in_info else None
+        
+        # 低分配模式：观察和 action_mask 写入预先分配的缓冲区并重复使用，
+        # 返回的数组在下一次 step / reset 时会被覆盖；info["history"] 为惰性视图
+        self.reuse_buffers = reuse_buffers
+        if reuse_buffers:
+            self._observation_buffer = {
+                "observation": np.zeros((10, 9), dtype=np.float32),
+                "action_mask": np.zeros(90 * 90, dtype=bool),
+            }
+            self._move_values_buffer = np.zeros(90 * 90, dtype=np.float32)
+        
+        # info["move_values"] 中给出当前局面所有合法走法的价值，与 action_mask 对齐
+        self.move_values = move_values
+        
+        # 内置对手: "random"、"greedy" 或 opponent(env) -> action，智能体执红先行，
+        # step 走完智能体的一步后由对手应一步，返回智能体视角的结果
+        if isinstance(opponent, str):
+            if opponent not in opponents:
+                raise RuntimeError(f"opponent {opponent} not recognized")
+            self._opponent = opponents[opponent]
+        else:
+            self._opponent = opponent
+        self.opponent = opponent
     
     # 生成观察空间
     def generate_observation(self) -> dict[str, np.ndarray]:
@@ -67,13 +155,25 @@ class CnChessEnv(gym.Env):
         #         # 如果 i 是奇数，则将当前位置的棋盘状态旋转 180 度后转换为 numpy 数组并存储在 observation 中
         #         observation[i] = Position(one_pos).rotate().to_numpy()
 
+        t = tic(self._stats)
+        if self.reuse_buffers:
+            buffer = self._observation_buffer
+            self.pos.to_numpy(out=buffer["observation"])
+            t = toc(self._stats, "observation.board", t)
+            buffer["action_mask"].fill(False)
+            buffer["action_mask"][self._legal_actions()] = True
+            toc(self._stats, "observation.mask", t)
+            return buffer
+        
         # to float 32
         observation = self.pos.to_numpy().astype(np.float32)
-        possible_actions = self.get_possible_actions()
+        t = toc(self._stats, "observation.board", t)
+        possible_actions = self._legal_actions()
         # 创建一个全 0 的数组，用于表示所有可能的行动
         action_mask = np.zeros(90 * 90, dtype=bool)
         # 将可能的行动的索引设置为 True
         action_mask[possible_actions] = True
+        toc(self._stats, "observation.mask", t)
 
         return {
             "observation": observation,
@@ -84,98 +184,214 @@ class CnChessEnv(gym.Env):
               seed: int | None = None,
               options: dict[str, Any] | None = None) -> Tuple[np.ndarray, dict]:
         # > Tuple[ObsType, dict[str, Any]
+        # 设置 np_random 的种子，内置对手使用 np_random 选择走法
+        super().reset(seed=seed)
+        if self._stats is not None:
+            self._stats.begin("resets")
+        t_start = tic(self._stats)
         
         self.pos = Position(initial)
-        self.his = [copy.copy(self.pos.board)]
+        self.his.clear()
+        self.his.append(self.pos.board)
         self.pos_dict = {self.pos.board: 1}
         self.current_player = 0
         self.resigned = [False, False]
         self.board_count = {}
+        self._board_count_shared = False
         
         info = {
             "history": [],
             "value": 0,
         }
+        if self.move_values:
+            info["move_values"] = self._all_move_values()
         if self.render_mode == "human":
             self._render_frame()
         
-        return self.generate_observation(), info
+        observation = self.generate_observation()
+        toc(self._stats, "reset", t_start)
+        if self.stats_in_info:
+            info["stats"] = self._stats.current
+        return observation, info
     
     def step(self, action: int) -> tuple[np.ndarray, float, bool, bool, dict]:
         """
         执行一步棋
         """
+        if self._stats is not None:
+            self._stats.begin("steps")
+        t_start = t = tic(self._stats)
         # 获取可能的行动
-        possible_actions = self.get_possible_actions()
+        possible_actions = self._legal_actions()
         # 断言 action 在 possible_actions 中
         assert (action in possible_actions)
         # 断言当前玩家有将军
         assert (self.pos.player_has_king())
-        # 将 action 转换为移动字符串
-        action_str = self.action2move(action)
+        t = toc(self._stats, "step.legal_check", t)
         # 如果 action 是 resign, 投降
-        if action_str == "resign":
+        if self.has_resigned(action):
             assert self.resigned[self.current_player] is not True
             self.resigned[self.current_player] = True
             reward = -1
             terminated = True
-            info = {"history": self.get_history_positions()}
+            info = {"history": self._info_history()}
             truncated = False
-            return self.generate_observation(), reward, terminated, truncated, info
-        else:
-            # action str 应该类似b2e2
-            if len(action_str) > 4:
-                raise RuntimeError(f"action {action} not recognized")
-            # 将动作字符串拆分为起始位置和目标位置
-            from_str, to_str = action_str[:2], action_str[2:]
-            # 将字符串坐标转换为数字坐标
-            from_cord, to_cord = self.str2cord(from_str), self.str2cord(to_str)
-            
-            # 计算移动带来的价值变化
-            value_diff = get_move_value(self.pos.board, (from_cord, to_cord))
-            
-            # 获取要移动的棋子
-            move_piece = self.pos.board[from_cord]
-            
-            # 执行移动
-            self.pos = self.pos.move((from_cord, to_cord))
-            
-            # 记录历史局面
-            self.his.append(copy.copy(self.pos.board))
-            self.his = self.his[-6:]  # 只保留最近6个局面
-            
-            # 更新局面计数
-            self.board_count.setdefault(self.pos.board, 0)
-            self.board_count[self.pos.board] += 1
-            
-            reward = 0
-            if self.board_count[self.pos.board] >= 3:
-                # 如果棋盘状态重复了3次，且移动的棋子不是帅/将，则游戏结束
-                if move_piece != "K":
-                    terminated = True
-                    reward = -1
+            return self._finish_step(t_start, self.generate_observation(), reward, terminated, truncated, info)
+        
+        reward, terminated, info = self._play(action, t)
+        t = tic(self._stats)
+        # 对手应着，不生成中间局面的观察，奖励转换为智能体视角
+        if self._opponent is not None and not terminated:
+            opponent_actions = self._legal_actions()
+            if not opponent_actions:
+                # 对手无子可动判负
+                reward, terminated = 1, True
+                self._pass_turn()
+            else:
+                try:
+                    opponent_action = int(self._opponent(self))
+                    if not self.has_resigned(opponent_action) and opponent_action not in opponent_actions:
+                        raise RuntimeError(f"opponent action {opponent_action} not recognized")
+                except Exception:
+                    self._undo_play()
+                    raise
+                t = toc(self._stats, "opponent.choose", t)
+                info["opponent_action"] = opponent_action
+                if self.has_resigned(opponent_action):
+                    self.resigned[self.current_player] = True
+                    reward, terminated = 1, True
+                    self._pass_turn()
                 else:
-                    terminated = False
-            elif not self.pos.player_has_king():
-                # 这里条件是player has king，但是由于在pos.move中局面被rotate过（红黑交换），所以这里其实在判断这一步完成后是否已经吃掉对方将军
+                    opponent_reward, terminated, opponent_info = self._play(opponent_action, t, self._opponent_phases)
+                    reward = -opponent_reward
+                    info["opponent_value"] = opponent_info["value"]
+                    if "tablebase" in opponent_info:
+                        info["tablebase"] = opponent_info["tablebase"]
+                t = tic(self._stats)
+        
+        # 只保留最近6个局面
+        del self.his[:-6]
+        info["history"] = self._info_history()
+        if self.move_values:
+            info["move_values"] = self._all_move_values()
+            toc(self._stats, "step.move_values", t)
+        
+        truncated = False
+        
+        return self._finish_step(t_start, self.generate_observation(), reward, terminated, truncated, info)
+    
+    # _play 各阶段的统计名称，智能体和对手的一步分开统计
+    _step_phases = ("step.encode", "step.value", "step.move", "step.repetition", "step.tablebase", "step.render")
+    _opponent_phases = tuple(name.replace("step.", "opponent.") for name in _step_phases)
+    
+    def _play(self, action: int, t: float, phases: Tuple[str, ...] = _step_phases) -> tuple[float, bool, dict]:
+        """
+        当前行棋方走一步棋，返回行棋方视角的 (奖励, 是否结束, info)
+        """
+        if not 0 <= action < 90 * 90:
+            raise RuntimeError(f"action {action} not recognized")
+        # 将动作拆分为起始位置和目标位置，并转换为数字坐标
+        from_act, to_act = divmod(action, 90)
+        from_cord, to_cord = square_cord[from_act], square_cord[to_act]
+        t = toc(self._stats, phases[0], t)
+        
+        # 计算移动带来的价值变化
+        value_diff = get_move_value(self.pos.board, (from_cord, to_cord))
+        t = toc(self._stats, phases[1], t)
+        
+        # 获取要移动的棋子
+        move_piece = self.pos.board[from_cord]
+        
+        # 执行移动
+        self.pos = self.pos.move((from_cord, to_cord))
+        
+        # 记录历史局面，step 结束时只保留最近6个局面
+        self.his.append(self.pos.board)
+        t = toc(self._stats, phases[2], t)
+        
+        # 更新局面计数
+        if self._board_count_shared:
+            self.board_count = dict(self.board_count)
+            self._board_count_shared = False
+        self.board_count.setdefault(self.pos.board, 0)
+        self.board_count[self.pos.board] += 1
+        
+        reward = 0
+        if self.board_count[self.pos.board] >= 3:
+            # 如果棋盘状态重复了3次，且移动的棋子不是帅/将，则游戏结束
+            if move_piece != "K":
                 terminated = True
-                reward = 1
+                reward = -1
             else:
                 terminated = False
-            # 交换红黑方
-            self.current_player = 1 - self.current_player
-            
-            info = {
-                "history": self.get_history_positions(),
-                "value": value_diff,
-            }
-            
-            if self.render_mode == "human":
-                self._render_frame()
-            
-            truncated = False
-            
-            return self.generate_observation(), reward, terminated, truncated, info
+        elif not self.pos.player_has_king():
+            # 这里条件是player has king，但是由于在pos.move中局面被rotate过（红黑交换），所以这里其实在判断这一步完成后是否已经吃掉对方将军
+            terminated = True
+            reward = 1
+        else:
+            terminated = False
+        t = toc(self._stats, phases[3], t)
+        
+        info = {"value": value_diff}
+        # 残局库判定，结果是对手 (新的行棋方) 视角的
+        if not terminated and self.tablebase is not None:
+            tablebase_result = self.tablebase.probe(self.pos)
+            if tablebase_result is not None:
+                terminated = True
+                reward = -tablebase_result[0]
+                info["tablebase"] = tablebase_result
+            t = toc(self._stats, phases[4], t)
+        # 交换红黑方
+        self.current_player = 1 - self.current_player
+        
+        if self.render_mode == "human":
+            self._render_frame()
+            toc(self._stats, phases[5], t)
+        
+        return reward, terminated, info
+    
+    def _undo_play(self):
+        """
+        撤销 _play 走的一步 (不包括渲染)，历史局面在 step 结束前没有截断，最后一个之前就是原来的局面
+        """
+        board = self.his.pop()
+        count = self.board_count[board] - 1
+        if count:
+            self.board_count[board] = count
+        else:
+            del self.board_count[board]
+        self.pos = Position(self.his[-1])
+        self.current_player = 1 - self.current_player
+    
+    def _pass_turn(self):
+        """
+        对手认输或无子可动时把局面交还给智能体，观察和 action_mask 为智能体视角
+        """
+        self.pos = self.pos.rotate()
+        self.current_player = 1 - self.current_player
+    
+    def _finish_step(self, t_start, observation, reward, terminated, truncated, info):
+        toc(self._stats, "step", t_start)
+        if self.stats_in_info:
+            info["stats"] = self._stats.current
+        return observation, reward, terminated, truncated, info
+    
+    def stats(self) -> dict:
+        """
+        返回性能统计
+        timings: 各阶段的调用次数、累计耗时、平均耗时、最近一次耗时 (秒)
+        counters: steps、resets、moves_generated、cache_hits、cache_misses
+        repetition_size: 局面计数字典的大小
+        """
+        if self._stats is None:
+            raise RuntimeError("stats not enabled, create env with stats=True")
+        out = self._stats.as_dict()
+        out["repetition_size"] = len(self.board_count)
+        return out
+    
+    def reset_stats(self):
+        if self._stats is not None:
+            self._stats.reset()
     
     def render(self):
         if self.render_mode == "rgb_array":
@@ -192,9 +408,43 @@ class CnChessEnv(gym.Env):
                 self.window.update_board_pieces(self.pos.board)
                 self.window.update_board()
     
+    def get_state(self) -> CnChessState:
+        """
+        获取当前棋局状态的快照，不复制局面计数，开销与棋局长度无关
+        """
+        self._board_count_shared = True
+        return CnChessState(
+            board=self.pos.board,
+            current_player=self.current_player,
+            resigned=tuple(self.resigned),
+            board_count=self.board_count,
+            history=tuple(self.his),
+        )
+    
+    def set_state(self, state: CnChessState):
+        """
+        恢复 get_state 获取的快照，同一个快照可以多次恢复
+        """
+        self.pos = Position(state.board)
+        self.current_player = state.current_player
+        self.resigned = list(state.resigned)
+        self.board_count = state.board_count
+        self._board_count_shared = True
+        self.his.clear()
+        self.his.extend(state.history)
+    
     def get_history_positions(self):
         return [Position(i) for i in self.his]
     
+    def _all_move_values(self):
+        out = self._move_values_buffer if self.reuse_buffers else None
+        return get_all_move_values(self.pos.board, self._legal_actions(), out=out)
+    
+    def _info_history(self):
+        if self.reuse_buffers:
+            return HistoryView(tuple(self.his))
+        return self.get_history_positions()
+    
     """
     ==============================
     classmethod
@@ -258,8 +508,31 @@ class CnChessEnv(gym.Env):
             return move_int
     
     def get_possible_actions(self):
-        moves = self.get_possible_moves()
-        return [self.move_to_action(m) for m in moves]
+        return list(self._legal_actions())
+    
+    def _legal_actions(self) -> list[int]:
+        """
+        当前局面可能的行动，按局面缓存，返回的列表不要修改
+        """
+        if self.resigned[self.current_player]:
+            return []
+        board, actions = self._actions_cache
+        if board == self.pos.board:
+            if self._stats is not None:
+                self._stats.count("cache_hits")
+            return actions
+        t = tic(self._stats)
+        if self.pos.player_has_king():
+            actions = [cord_square[i] * 90 + cord_square[j] for i, j in self.pos.gen_moves()]
+        else:
+            # 如果将军已经被吃掉，那么输了，返回空的数组
+            actions = []
+        self._actions_cache = (self.pos.board, actions)
+        if self._stats is not None:
+            toc(self._stats, "move_gen", t)
+            self._stats.count("cache_misses")
+            self._stats.count("moves_generated", len(actions))
+        return actions
     
     def get_possible_moves(self) -> list[str]:
         """
@@ -30,6 +30,23 @@ pos_str_mapping = {'R': '车', 'N': '马', 'B': '相', 'A': '仕', 'K': '帅', '
 
 A0, I0, A9, I9 = 12 * 16 + 3, 12 * 16 + 11, 3 * 16 + 3, 3 * 16 + 11
 
+# 棋子编号，与 to_numpy 的输出一致
+piece_code = {'R': 1, 'N': 2, 'B': 3, 'A': 4, 'K': 5, 'P': 6, 'C': 7,
+              'r': -1, 'n': -2, 'b': -3, 'a': -4, 'k': -5, 'p': -6, 'c': -7, '.': 0}
+# 字符 (ascii) -> 棋子编号 查找表
+code_table = np.zeros(256, dtype=np.int8)
+for _p, _v in piece_code.items():
+    code_table[ord(_p)] = _v
+
+# to_numpy 的 10x9 布局中每个格子对应的棋盘下标，第 0 行为 rank 9
+board_index = np.array([[A9 + c + 16 * r for c in range(9)] for r in range(10)])
+
+# 动作使用的格子编号 fil + 9 * rank 与棋盘下标之间的换算，棋盘外为 -1
+square_cord = [A0 + fil - 16 * rank for rank in range(10) for fil in range(9)]
+cord_square = [-1] * 256
+for _sq, _cord in enumerate(square_cord):
+    cord_square[_cord] = _sq
+
 
 # N, E, S, W 分别代表北、东、南、西四个方向的移动 (上下左右)
 N, E, S, W = -16, 1, 16, -1
@@ -45,6 +62,12 @@ directions = {
     'K': (N, E, S, W)
 }
 
+# 吃子排序 (MVV-LVA)，按 cn_chess_value.piece 的子力价值
+# 被吃的棋子价值从大到小
+mvv_order = 'krncpab'
+# 吃子的棋子价值从小到大
+lva_order = 'ABPCNRK'
+
 
 class Position(namedtuple('Position', 'board')):
     board: str
@@ -129,6 +152,88 @@ class Position(namedtuple('Position', 'board')):
                     # Stop crawlers from sliding, and sliding after captures
                     if p in 'PNBAK' or q.islower(): break
 
+    def gen_captures(self) -> Generator[Tuple[int, int], None, None]:
+        """
+        只生成吃子的移动，结果与 gen_moves 中的吃子移动一致
+        从对方棋子的位置反向查找能吃到它的棋子，按 MVV-LVA 排序：
+        先吃价值大的棋子，同一个目标先用价值小的棋子吃
+        """
+        board = self.board
+        for q in mvv_order:
+            j = board.find(q)
+            while j != -1:
+                attackers = self._attackers(j)
+                if len(attackers) > 1:
+                    attackers.sort(key=lambda i: lva_order.index(board[i]))
+                for i in attackers:
+                    yield (i, j)
+                j = board.find(q, j + 1)
+
+    def gen_quiets(self) -> Generator[Tuple[int, int], None, None]:
+        """
+        只生成不吃子的移动
+        """
+        for move in self.gen_moves():
+            if self.board[move[1]] == '.':
+                yield move
+
+    def _attackers(self, j):
+        """
+        能吃到 j 位置棋子的己方棋子位置
+        """
+        board = self.board
+        attackers = []
+        # 车/車、炮/砲 沿四个方向查找，第一个棋子是车，第二个棋子是炮 (中间为炮架)
+        for d in directions['R']:
+            i = j + d
+            while board[i] == '.':
+                i += d
+            p = board[i]
+            if p in ' \n':
+                continue
+            if p == 'R':
+                attackers.append(i)
+            # 帅/将 对面：帅在下方，中间没有棋子
+            elif p == 'K' and d == S and board[j] == 'k' and j > A9:
+                attackers.append(i)
+            i += d
+            while board[i] == '.':
+                i += d
+            if board[i] == 'C':
+                attackers.append(i)
+        # 马/馬，从 i 跳到 j，蹩马脚的判断与 gen_moves 相同
+        for d in directions['N']:
+            i = j - d
+            if board[i] != 'N': continue
+            n_diff_x = d & 15
+            if n_diff_x == 14 or n_diff_x == 2:
+                leg = i + (1 if n_diff_x == 2 else -1)
+            else:
+                leg = i + 16 if j > i else i - 16
+            if board[leg] == '.':
+                attackers.append(i)
+        # 兵/卒 向前吃，过河后可以横着吃
+        if board[j + 16] == 'P':
+            attackers.append(j + 16)
+        for i in (j - 1, j + 1):
+            if board[i] == 'P' and i <= 128:
+                attackers.append(i)
+        # 相/象 不能过河，田字中间不能有棋子
+        if j >= 128:
+            for d in directions['B']:
+                i = j - d
+                if board[i] == 'B' and board[i + d // 2] == '.':
+                    attackers.append(i)
+            # 士/帅 只能在九宫内
+            if not (j < 160 or j & 15 > 8 or j & 15 < 6):
+                for d in directions['A']:
+                    if board[j - d] == 'A':
+                        attackers.append(j - d)
+                for d in directions['K']:
+                    if board[j - d] == 'K':
+                        attackers.append(j - d)
+        return attackers
+
     def rotate(self):
         ''' 方法旋转棋盘,用于切换红黑方 '''
         # +" " 避免开头始终为 空格
@@ -194,20 +299,62 @@ class Position(namedtuple('Position', 'board')):
         out_str += '  ａｂｃｄｅｆｇｈｉ\n\n'
         return out_str
 
-    def to_numpy(self):
-        out_str = "\n"
-        uni_pieces = {'R': 1, 'N': 2, 'B': 3, 'A': 4, 'K': 5, 'P': 6, 'C': 7,
-                      'r': -1, 'n': -2, 'b': -3, 'a': -4, 'k': -5, 'p': -6, 'c': -7, '.': 0}
-        ind = 0
-        out_array = np.zeros((10, 9))
-        for i, row in enumerate(self.board.split()):
-            row = row.replace(" ", "")
-            if row:
-                out_array[ind] = np.asarray([uni_pieces[j] for j in row])
-                ind += 1
-        return out_array
+    def to_numpy(self, out=None):
+        """
+        转换为 10x9 数组，1-7 为行棋方棋子，-1 - -7 为对方棋子，0 为空位
+        out 不为 None 时写入 out 并返回 out
+        """
+        if out is None:
+            out = np.zeros((10, 9))
+        raw = np.frombuffer(self.board.encode(), dtype=np.uint8)
+        out[...] = code_table[raw[board_index]]
+        return out
+
+
+# 初始局面的 FEN
+start_fen = 'rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1'
+# FEN 中 马、相 的另一种写法
+fen_aliases = {'H': 'N', 'E': 'B', 'h': 'n', 'e': 'b'}
 
 
+def from_fen(fen: str) -> Tuple[Position, bool]:
+    """
+    解析 FEN，返回 (行棋方视角的 Position, 是否红方行棋)
+    FEN 中大写为红方，第一行为 rank 9
+    """
+    fields = fen.split()
+    rows = fields[0].split('/')
+    if len(rows) != 10:
+        raise RuntimeError(f"fen {fen} not recognized")
+    board_rows = []
+    for row in rows:
+        cells = ''
+        for c in row:
+            cells += '.' * int(c) if c.isdigit() else fen_aliases.get(c, c)
+        if len(cells) != 9 or any(c not in pos_str_mapping for c in cells):
+            raise RuntimeError(f"fen {fen} not recognized")
+        board_rows.append('   ' + cells + '   \n')
+    empty_row = ' ' * 15 + '\n'
+    pos = Position(empty_row * 3 + ''.join(board_rows) + empty_row * 3)
+    red_to_move = len(fields) < 2 or fields[1] in ('w', 'r')
+    return (pos if red_to_move else pos.rotate()), red_to_move
 
 
+def iccs_to_move(iccs: str, red_to_move: bool) -> Tuple[int, int]:
+    """
+    ICCS 走法 (例如 h2e2，红方视角的坐标) 转换为行棋方视角的棋盘下标
+    """
+    i = A0 + ord(iccs[0]) - ord('a') - 16 * int(iccs[1])
+    j = A0 + ord(iccs[2]) - ord('a') - 16 * int(iccs[3])
+    return (i, j) if red_to_move else (254 - i, 254 - j)
 
+
+def move_to_iccs(move: Tuple[int, int], red_to_move: bool) -> str:
+    """
+    行棋方视角的棋盘下标转换为 ICCS 走法
+    """
+    def square(i):
+        rank, fil = divmod(i - A0, 16)
+        return chr(fil + ord('a')) + str(-rank)
+    i, j = move if red_to_move else (254 - move[0], 254 - move[1])
+    return square(i) + square(j)
@@ -0,0 +1,164 @@
+# 批量走法生成
+# 对 (N, 10, 9) 的棋盘数组一次性生成所有走法，结果与 Position.gen_moves 完全一致。
+# 马、相通过平移后的棋盘判断 蹩马脚 / 塞象眼，车、炮沿射线累计经过的棋子数判断阻挡和炮架。
+#
+# 棋盘布局与 Position.to_numpy 相同：第 0 行为 rank 9，1-7 为红方棋子，-1 - -7 为黑方棋子。
+# 内部转置为 (10, 9, N)，每个格子上 N 个棋盘的数据连续存放，逐元素运算可以向量化。
+
+from typing import Union
+
+import numpy as np
+
+R, N, B, A, K, P, C = 1, 2, 3, 4, 5, 6, 7
+
+# 棋盘外
+OFF = 8
+# 射线最多走 9 格，四周各填充 9 格
+PAD = 9
+
+# (10, 9) 布局中每个格子的格子编号 fil + 9 * rank
+square = np.array([[(9 - r) * 9 + c for c in range(9)] for r in range(10)])
+
+# 九宫
+_palace = np.zeros((10, 9), dtype=bool)
+_palace[7:, 3:6] = True
+# 己方半场 (相不能过河)
+_own_half = np.zeros((10, 9), dtype=bool)
+_own_half[5:] = True
+# 过河的兵
+_crossed = ~_own_half
+
+_knight_moves = (
+    # (dr, dc, 马腿 dr, 马腿 dc)
+    (-2, 1, -1, 0), (-2, -1, -1, 0), (2, 1, 1, 0), (2, -1, 1, 0),
+    (-1, 2, 0, 1), (1, 2, 0, 1), (-1, -2, 0, -1), (1, -2, 0, -1),
+)
+_bishop_moves = ((-2, 2), (2, 2), (2, -2), (-2, -2))
+_advisor_moves = ((-1, 1), (1, 1), (1, -1), (-1, -1))
+_orthogonal = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+# 所有偏移量 (dr, dc) -> 层编号
+_offsets = {}
+for _dr, _dc in (_advisor_moves + _bishop_moves + tuple(m[:2] for m in _knight_moves)
+                 + tuple((k * dr, k * dc) for dr, dc in _orthogonal for k in range(1, 10))):
+    _offsets.setdefault((_dr, _dc), len(_offsets))
+_offset_dr = np.array([dr for dr, _ in _offsets])
+_offset_dc = np.array([dc for _, dc in _offsets])
+
+
+class _Shifter:
+    """
+    取平移 (dr, dc) 之后的棋盘：结果中 (r, c) 位置是原棋盘 (r + dr, c + dc) 的内容
+    array 的形状为 (10, 9, ...)
+    """
+
+    def __init__(self, array, value):
+        self.padded = np.full((10 + 2 * PAD, 9 + 2 * PAD) + array.shape[2:], value, dtype=array.dtype)
+        self.padded[PAD:PAD + 10, PAD:PAD + 9] = array
+
+    def __call__(self, dr, dc):
+        return self.padded[PAD + dr:PAD + dr + 10, PAD + dc:PAD + dc + 9]
+
+
+def _nonzero(valid):
+    """
+    np.nonzero 的快速版本，走法很稀疏，先按 8 字节一组找到非零的组再展开
+    valid 的最后一维长度必须是 8 的倍数
+    """
+    flat = valid.reshape(-1)
+    words = np.flatnonzero(flat.view(np.uint64))
+    word_index, byte_index = np.nonzero(flat.reshape(-1, 8)[words])
+    return np.unravel_index(words[word_index] * 8 + byte_index, valid.shape)
+
+
+def to_mover_frame(boards: np.ndarray, side: Union[int, np.ndarray] = 0) -> np.ndarray:
+    """
+    side 为 1 (黑方行棋) 的棋盘旋转 180 度并交换红黑，转换为行棋方视角
+    CnChessEnv 的观察已经是行棋方视角，直接使用 side=0
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    side = np.broadcast_to(np.asarray(side, dtype=bool), boards.shape[:1])
+    if not side.any():
+        return boards
+    boards = boards.copy()
+    boards[side] = -boards[side][:, ::-1, ::-1]
+    return boards
+
+
+def batch_moves(boards: np.ndarray, side: Union[int, np.ndarray] = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    批量生成走法，返回紧凑形式 (棋盘下标, 动作编号)，按棋盘下标排序
+    boards: (N, 10, 9) 棋盘数组
+    side: 行棋方，0 红方、1 黑方，可以是每个棋盘一个值的数组
+    """
+    n_boards = len(boards)
+    # 补齐到 8 的倍数
+    n_padded = -(-n_boards // 8) * 8
+    boards_t = np.zeros((10, 9, n_padded), dtype=np.int8)
+    boards_t[..., :n_boards] = to_mover_frame(boards, side).transpose(1, 2, 0)
+    boards = boards_t
+    shift = _Shifter(boards, OFF)
+    palace = _Shifter(_palace[..., None], False)
+    own_half = _Shifter(_own_half[..., None], False)
+
+    # 每个偏移量一层，同一格子只有一个棋子，不同棋子的同一偏移量可以合并到一层
+    valid = np.zeros((len(_offsets), 10, 9, n_padded), dtype=bool)
+
+    def add(move_valid, dr, dc):
+        valid[_offsets[dr, dc]] |= move_valid
+
+    # 目标格为空或对方棋子 (棋盘外 OFF 为正数)
+    def target_ok(dr, dc):
+        return shift(dr, dc) <= 0
+
+    # 帅/将、士 只能在九宫内走
+    is_king, is_advisor = boards == K, boards == A
+    for dr, dc in _orthogonal:
+        add(is_king & palace(dr, dc) & target_ok(dr, dc), dr, dc)
+    for dr, dc in _advisor_moves:
+        add(is_advisor & palace(dr, dc) & target_ok(dr, dc), dr, dc)
+
+    # 相/象 不能过河，象眼不能有棋子
+    is_bishop = boards == B
+    for dr, dc in _bishop_moves:
+        add(is_bishop & own_half(dr, dc) & (shift(dr // 2, dc // 2) == 0) & target_ok(dr, dc), dr, dc)
+
+    # 马/馬 马腿不能有棋子
+    is_knight = boards == N
+    for dr, dc, leg_r, leg_c in _knight_moves:
+        add(is_knight & (shift(leg_r, leg_c) == 0) & target_ok(dr, dc), dr, dc)
+
+    # 兵/卒 向前，过河后可以横走
+    is_pawn = boards == P
+    add(is_pawn & target_ok(-1, 0), -1, 0)
+    for dc in (1, -1):
+        add(is_pawn & _crossed[..., None] & target_ok(0, dc), 0, dc)
+
+    # 车/車、炮/砲 以及 帅/将 对面照将，沿射线累计经过的棋子数
+    is_rook, is_cannon = boards == R, boards == C
+    for dr, dc in _orthogonal:
+        blockers = np.zeros(boards.shape, dtype=np.int8)
+        for k in range(1, 10):
+            target = shift(k * dr, k * dc)
+            free = blockers == 0
+            move_valid = is_rook & free & (target <= 0)
+            move_valid |= is_cannon & ((free & (target == 0)) | ((blockers == 1) & (target < 0)))
+            if dr == -1:
+                move_valid |= is_king & free & (target == -K)
+            add(move_valid, k * dr, k * dc)
+            blockers += target != 0
+
+    offset, r, c, batch_index = _nonzero(valid)
+    actions = square[r, c] * 90 + square[r + _offset_dr[offset], c + _offset_dc[offset]]
+    order = np.argsort(batch_index, kind="stable")
+    return batch_index[order], actions[order]
+
+
+def batch_action_mask(boards: np.ndarray, side: Union[int, np.ndarray] = 0) -> np.ndarray:
+    """
+    批量生成 (N, 8100) 的走法 mask
+    """
+    batch_index, actions = batch_moves(boards, side)
+    mask = np.zeros((len(boards), 90 * 90), dtype=bool)
+    mask[batch_index, actions] = True
+    return mask
@@ -0,0 +1,69 @@
+# 环境性能统计
+# 记录 step / reset / generate_observation 各阶段的累计耗时、调用次数和最近一次耗时，以及计数器
+
+from time import perf_counter
+
+
+class EnvStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # phase -> 累计耗时 (秒)
+        self.total = {}
+        # phase -> 调用次数
+        self.calls = {}
+        # phase -> 最近一次耗时 (秒)
+        self.last = {}
+        # 本次 step / reset 调用中各阶段的耗时
+        self.current = {}
+        # 计数器，例如生成的走法数、缓存命中次数
+        self.counters = {}
+
+    def add(self, phase: str, seconds: float):
+        self.total[phase] = self.total.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self.last[phase] = seconds
+        self.current[phase] = seconds
+
+    def begin(self, name: str):
+        """
+        开始一次 step / reset 调用
+        """
+        self.current = {}
+        self.count(name)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self) -> dict:
+        return {
+            "timings": {
+                phase: {
+                    "calls": self.calls[phase],
+                    "total": total,
+                    "mean": total / self.calls[phase],
+                    "last": self.last[phase],
+                }
+                for phase, total in self.total.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+
+def tic(stats):
+    """
+    开始计时，统计关闭时返回 None
+    """
+    return perf_counter() if stats is not None else None
+
+
+def toc(stats, phase, t0):
+    """
+    结束计时并记录到 phase，返回当前时间用于下一阶段的计时
+    """
+    if t0 is None:
+        return None
+    t1 = perf_counter()
+    stats.add(phase, t1 - t0)
+    return t1
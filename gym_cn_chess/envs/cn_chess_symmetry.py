@@ -0,0 +1,54 @@
+# 棋盘左右镜像，用于数据增强
+# 象棋规则左右对称，观察 (Position.to_numpy 的 10x9 布局)、action_mask、动作都可以精确镜像。
+# 镜像通过预先计算好的置换索引批量完成，可以作用于任意数量的样本。
+
+import numpy as np
+
+from .cn_chess_logic import A0
+
+# 格子编号 fil + 9 * rank (与 CnChessEnv.str2action 一致) 的镜像
+mirror_square = np.arange(90).reshape(10, 9)[:, ::-1].ravel()
+
+# 动作编号 from * 90 + to 的镜像，镜像是对合 (两次镜像还原)，所以 gather 和 scatter 相同
+mirror_action = (mirror_square[:, None] * 90 + mirror_square[None, :]).ravel()
+
+# 256 字符棋盘下标的镜像，棋盘外的位置不变
+mirror_cord = np.arange(256)
+for _rank in range(10):
+    _row = A0 - 16 * _rank
+    mirror_cord[_row:_row + 9] = mirror_cord[_row:_row + 9][::-1]
+
+
+def mirror_board(board: str) -> str:
+    """
+    镜像 Position.board
+    """
+    return "".join([board[i] for i in mirror_cord])
+
+
+def mirror_observations(observations: np.ndarray) -> np.ndarray:
+    """
+    镜像 (..., 10, 9) 的观察
+    """
+    return np.ascontiguousarray(observations[..., ::-1])
+
+
+def mirror_masks(masks: np.ndarray) -> np.ndarray:
+    """
+    镜像 (..., 8100) 的 action_mask
+    """
+    return np.take(masks, mirror_action, axis=-1)
+
+
+def mirror_actions(actions: np.ndarray) -> np.ndarray:
+    """
+    镜像动作编号数组
+    """
+    return mirror_action[actions]
+
+
+def mirror_batch(observations: np.ndarray, masks: np.ndarray, actions: np.ndarray):
+    """
+    同时镜像一批 (N, 10, 9) 观察、(N, 8100) action_mask 和 N 个动作
+    """
+    return mirror_observations(observations), mirror_masks(masks), mirror_actions(actions)
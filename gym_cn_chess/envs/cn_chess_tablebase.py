@@ -0,0 +1,324 @@
+# 残局库
+# 对少子残局 (例如 车 对 士、马兵 对 将) 做逆向分析 (retrograde analysis)，
+# 记录每个局面的 胜/负/和 以及 距离吃将的步数 (distance to mate, 以半回合计)。
+#
+# 每一种子力组合保存为一个 .npy 文件，局面索引是对棋子摆放的完美哈希：
+# 每个棋子只在它能到达的格子上取值 (帅/将 9 格、士 5 格、相 7 格、兵 55 格、其他 90 格)，
+# 索引 = 行棋方 * N + 各棋子格子编号的混合进制数。
+#
+# 环境中游戏以吃掉对方 帅/将 结束，所以这里的 "将死" 指 "必然被吃将"，无子可动 (困毙) 判负。
+
+import os
+from array import array
+from itertools import product
+from typing import Optional, Union
+
+import numpy as np
+
+from .cn_chess_logic import Position, initial, A0
+from .cn_chess_value import piece
+
+# 棋子在子力字符串中的顺序
+piece_order = "KRNCPAB"
+
+# 存储格式: value = dtm << 2 | wdl_code
+WDL_INVALID, WDL_LOSS, WDL_DRAW, WDL_WIN = 0, 1, 2, 3
+
+
+def _cord(fil, rank):
+    return A0 + fil - 16 * rank
+
+
+# 每种棋子在己方视角下能到达的格子
+domains = {
+    "K": tuple(_cord(f, r) for r in range(3) for f in range(3, 6)),
+    "A": tuple(_cord(f, r) for f, r in ((3, 0), (5, 0), (4, 1), (3, 2), (5, 2))),
+    "B": tuple(_cord(f, r) for f, r in ((2, 0), (6, 0), (0, 2), (4, 2), (8, 2), (2, 4), (6, 4))),
+    "P": tuple(_cord(f, r) for r in (3, 4) for f in (0, 2, 4, 6, 8)) + tuple(
+        _cord(f, r) for r in range(5, 10) for f in range(9)),
+    "R": tuple(_cord(f, r) for r in range(10) for f in range(9)),
+}
+domains["N"] = domains["C"] = domains["R"]
+
+# 空棋盘
+empty_board = "".join("." if c.isalpha() else c for c in initial)
+
+
+def material_key(pieces) -> str:
+    """
+    子力字符串，例如 ['R', 'K'] -> 'KR'
+    """
+    return "".join(sorted((p.upper() for p in pieces), key=piece_order.index))
+
+
+def canonical_config(a: str, b: str) -> tuple[str, str]:
+    """
+    子力组合的规范顺序，子力价值大的一方在前
+    """
+    def weight(m):
+        return sum(piece[p] for p in m), m
+    return (a, b) if weight(a) >= weight(b) else (b, a)
+
+
+def config_name(first: str, second: str) -> str:
+    return f"{first}_{second}"
+
+
+class TablebaseConfig:
+    """
+    一种子力组合的索引方式
+    first 一方为 side 0，second 一方为 side 1
+    """
+
+    def __init__(self, first: str, second: str):
+        for m in (first, second):
+            if m.count("K") != 1 or material_key(m) != m:
+                raise ValueError(f"material {m} not recognized")
+        self.first, self.second = first, second
+        self.name = config_name(first, second)
+        self.symmetric = first == second
+        # slot 列表: (棋子, 所属方)
+        self.slots = [(p, 0) for p in first] + [(p, 1) for p in second]
+        self.domains = [domains[p] for p, _ in self.slots]
+        self.digits = [{sq: d for d, sq in enumerate(dom)} for dom in self.domains]
+        self.strides = []
+        stride = 1
+        for dom in reversed(self.domains):
+            self.strides.append(stride)
+            stride *= len(dom)
+        self.strides.reverse()
+        # 单侧局面数
+        self.n = stride
+        self.size = 2 * stride
+
+    def index(self, mover: list, opponent: list) -> Optional[int]:
+        """
+        mover / opponent: [(棋子大写, 己方视角下的格子)]
+        mover 为行棋方，返回局面索引，子力不符或格子不在可达范围内返回 None
+        """
+        mover_key = material_key(p for p, _ in mover)
+        if mover_key == self.first and material_key(p for p, _ in opponent) == self.second:
+            side, pieces = 0, sorted(mover, key=_slot_key) + sorted(opponent, key=_slot_key)
+        elif mover_key == self.second and material_key(p for p, _ in opponent) == self.first:
+            side, pieces = 1, sorted(opponent, key=_slot_key) + sorted(mover, key=_slot_key)
+        else:
+            return None
+        idx = side * self.n
+        for (_, sq), digits, stride in zip(pieces, self.digits, self.strides):
+            digit = digits.get(sq)
+            if digit is None:
+                return None
+            idx += digit * stride
+        return idx
+
+    def positions(self):
+        """
+        按索引顺序遍历所有合法摆放，产生 (索引, 行棋方棋子列表, 对方棋子列表)
+        """
+        n_first = len(self.first)
+        for side in (0, 1):
+            # 双方子力相同时 side 1 与 side 0 等价，不再重复计算
+            if side == 1 and self.symmetric:
+                break
+            for idx, squares in enumerate(product(*self.domains), side * self.n):
+                pieces = [(p, sq) for (p, _), sq in zip(self.slots, squares)]
+                first, second = pieces[:n_first], pieces[n_first:]
+                if not (_is_canonical(first) and _is_canonical(second)):
+                    continue
+                # 换算到同一视角判断重叠
+                occupied = {sq for _, sq in first} | {254 - sq for _, sq in second}
+                if len(occupied) != len(pieces):
+                    continue
+                yield (idx, first, second) if side == 0 else (idx, second, first)
+
+
+def _slot_key(item):
+    return piece_order.index(item[0]), item[1]
+
+
+def _is_canonical(pieces):
+    # 相同棋子按格子升序排列，保证每个局面只有一个索引
+    return all(a[0] != b[0] or a[1] < b[1] for a, b in zip(pieces, pieces[1:]))
+
+
+def _board(mover, opponent) -> str:
+    cells = list(empty_board)
+    for p, sq in mover:
+        cells[sq] = p
+    for p, sq in opponent:
+        cells[254 - sq] = p.lower()
+    return "".join(cells)
+
+
+def _unpack(value):
+    code, dtm = int(value) & 3, int(value) >> 2
+    if code == WDL_INVALID:
+        return None
+    return code - 2, dtm
+
+
+def build_tablebase(first: str, second: str, directory: str) -> np.ndarray:
+    """
+    生成 first 对 second 的残局库并写入 directory，返回结果数组
+    吃子后进入的更少子力的残局库会被递归生成 (已存在的文件直接读取)
+    """
+    first, second = canonical_config(material_key(first), material_key(second))
+    config = TablebaseConfig(first, second)
+    path = os.path.join(directory, config.name + ".npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+
+    # 吃子后的残局库
+    sub_tables = {}
+    for captured_side, material in ((0, first), (1, second)):
+        for p in set(material) - {"K"}:
+            reduced = material.replace(p, "", 1)
+            a, b = (reduced, second) if captured_side == 0 else (first, reduced)
+            a, b = canonical_config(a, b)
+            if config_name(a, b) not in sub_tables:
+                sub_tables[config_name(a, b)] = (TablebaseConfig(a, b), build_tablebase(a, b, directory))
+
+    inf = np.iinfo(np.int32).max
+    valid = np.zeros(config.size, dtype=bool)
+    remaining = np.zeros(config.size, dtype=np.int32)
+    win_candidate = np.full(config.size, inf, dtype=np.int32)
+    max_child_win = np.full(config.size, -1, dtype=np.int32)
+    has_draw = np.zeros(config.size, dtype=bool)
+    edge_parent, edge_child = array("i"), array("i")
+
+    # 1. 正向生成每个局面的后继
+    for idx, mover, opponent in config.positions():
+        valid[idx] = True
+        pos = Position(_board(mover, opponent))
+        for i, j in pos.gen_moves():
+            q = pos.board[j]
+            if q == "k":
+                # 直接吃将
+                win_candidate[idx] = 1
+                break
+            new_opponent = [(p, j if sq == i else sq) for p, sq in mover]
+            if q == ".":
+                child = config.index(opponent, new_opponent)
+                edge_parent.append(idx)
+                edge_child.append(child)
+                remaining[idx] += 1
+                continue
+            # 吃子，进入子力更少的残局库
+            captured = opponent.index((q.upper(), 254 - j))
+            new_mover = opponent[:captured] + opponent[captured + 1:]
+            for sub_config, sub_table in sub_tables.values():
+                child = sub_config.index(new_mover, new_opponent)
+                if child is not None:
+                    wdl, dtm = _unpack(sub_table[child])
+                    break
+            if wdl < 0:
+                win_candidate[idx] = min(win_candidate[idx], dtm + 1)
+            elif wdl > 0:
+                max_child_win[idx] = max(max_child_win[idx], dtm)
+            else:
+                has_draw[idx] = True
+
+    # 2. 反向边 (子局面 -> 父局面)
+    edge_parent = np.frombuffer(edge_parent, dtype=np.int32)
+    edge_child = np.frombuffer(edge_child, dtype=np.int32)
+    order = np.argsort(edge_child, kind="stable")
+    parents = edge_parent[order]
+    offsets = np.zeros(config.size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edge_child, minlength=config.size), out=offsets[1:])
+
+    # 3. 按距离从小到大确定局面结果
+    result = np.zeros(config.size, dtype=np.uint16)
+    buckets = {}
+
+    def push(d, idx, code):
+        buckets.setdefault(d, []).append((idx, code))
+
+    def try_loss(idx):
+        # 所有走法都导致对方胜，且没有外部的胜/和走法
+        if remaining[idx] == 0 and win_candidate[idx] == inf and not has_draw[idx]:
+            push(max_child_win[idx] + 1, idx, WDL_LOSS)
+
+    for idx in np.flatnonzero(valid):
+        if win_candidate[idx] != inf:
+            push(int(win_candidate[idx]), idx, WDL_WIN)
+        else:
+            try_loss(idx)
+
+    d = 0
+    while buckets:
+        for idx, code in buckets.pop(d, ()):
+            if result[idx]:
+                continue
+            result[idx] = d << 2 | code
+            for parent in parents[offsets[idx]:offsets[idx + 1]]:
+                if result[parent]:
+                    continue
+                if code == WDL_LOSS:
+                    push(d + 1, parent, WDL_WIN)
+                else:
+                    remaining[parent] -= 1
+                    max_child_win[parent] = max(max_child_win[parent], d)
+                    try_loss(parent)
+        d += 1
+
+    # 4. 剩下的局面为和棋
+    result[valid & (result == 0)] = WDL_DRAW
+    os.makedirs(directory, exist_ok=True)
+    np.save(path, result)
+    return result
+
+
+class Tablebase:
+    """
+    残局库查询，文件以 mmap 方式按需打开
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.configs = {}
+        self.tables = {}
+        for filename in os.listdir(directory):
+            name, ext = os.path.splitext(filename)
+            if ext == ".npy" and name.count("_") == 1:
+                first, second = name.split("_")
+                # 目录中的其他 .npy 文件 (例如 shard_00000.npy) 不是残局库，跳过
+                try:
+                    config = TablebaseConfig(first, second)
+                except ValueError:
+                    continue
+                if config.name == name:
+                    self.configs[name] = config
+        self.max_pieces = max((len(c.slots) for c in self.configs.values()), default=0)
+
+    def _table(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            table = np.load(os.path.join(self.directory, name + ".npy"), mmap_mode="r")
+            self.tables[name] = table
+        return table
+
+    def probe(self, position: Union[Position, str]) -> Optional[tuple[int, int]]:
+        """
+        查询当前行棋方视角的结果，返回 (wdl, dtm)
+        wdl: 1 胜、0 和、-1 负；dtm: 距离吃将的半回合数
+        局面不在残局库中时返回 None
+        """
+        board = position.board if isinstance(position, Position) else position
+        # 快速排除子力过多的局面
+        n_pieces = len(board) - board.count(".") - board.count(" ") - board.count("\n")
+        if n_pieces > self.max_pieces:
+            return None
+        mover, opponent = [], []
+        for sq, p in enumerate(board):
+            if p.isupper():
+                mover.append((p, sq))
+            elif p.islower():
+                opponent.append((p.upper(), 254 - sq))
+        first, second = canonical_config(material_key(p for p, _ in mover), material_key(p for p, _ in opponent))
+        config = self.configs.get(config_name(first, second))
+        if config is None:
+            return None
+        idx = config.index(mover, opponent)
+        if idx is None:
+            return None
+        return _unpack(self._table(config.name)[idx])
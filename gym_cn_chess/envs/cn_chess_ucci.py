@@ -0,0 +1,284 @@
+# UCCI 引擎
+# 常驻进程，通过 stdin/stdout 使用 UCCI 协议通信，外部程序可以在一个进程里分析大量局面。
+# 置换表和走法缓存在命令之间保留，不需要每次重新启动 python 和导入模块。
+#
+#   python -m gym_cn_chess.envs.cn_chess_ucci
+#
+# 支持的命令: ucci, isready, setoption, position {fen <fen> | startpos} [moves ...],
+#            banmoves, go [depth <d> | nodes <n> | time <t> [movestogo <m>] [increment <i>] | infinite],
+#            stop, quit
+# go 为同步执行，go infinite 按 default_depth 搜索，time 的单位为毫秒。
+
+import sys
+import time
+from typing import TextIO
+
+from .cn_chess_logic import Position, start_fen, from_fen, iccs_to_move, move_to_iccs
+from .cn_chess_value import get_move_value, get_board_value
+
+# 吃掉帅/将 的分数
+MATE_VALUE = 100000
+# 分数超过该值视为杀棋
+MATE_LOWER = MATE_VALUE - 1000
+
+
+class _Timeout(Exception):
+    pass
+
+
+class UcciEngine:
+    name = "gym_cn_chess"
+    author = "theone"
+
+    def __init__(self, out: TextIO = sys.stdout, default_depth: int = 4, cache_size: int = 1_000_000):
+        self.out = out
+        self.default_depth = default_depth
+        self.cache_size = cache_size
+        # 置换表: board -> (深度, 分数, 分数类型, 最佳走法)
+        self.tt = {}
+        # 走法缓存: board -> 按 get_move_value 排序的走法
+        self.moves_cache = {}
+        self.pos, self.red_to_move = from_fen(start_fen)
+        # position 命令有误时局面无效，go 返回 nobestmove，直到收到正确的 position
+        self.position_valid = True
+        self.ban_moves = set()
+        self.nodes = 0
+        self._deadline = None
+        self._max_nodes = None
+
+    """
+    ==============================
+    protocol
+    ==============================
+    """
+
+    def send(self, line: str):
+        self.out.write(line + "\n")
+        self.out.flush()
+
+    def handle(self, line: str) -> bool:
+        """
+        处理一条命令，收到 quit 时返回 False
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        try:
+            return self.dispatch(command, args)
+        except Exception as e:
+            # 命令有误时报告错误，进程继续运行
+            self.send(f"info string error {command}: {e}")
+            return True
+
+    def dispatch(self, command, args) -> bool:
+        if command == "ucci":
+            self.send(f"id name {self.name}")
+            self.send(f"id author {self.author}")
+            self.send("ucciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "position":
+            self.set_position(args)
+        elif command == "banmoves":
+            self.ban_moves = set(args)
+        elif command == "go":
+            self.go(args)
+        elif command == "quit":
+            self.send("bye")
+            return False
+        # setoption、stop 等其他命令忽略
+        return True
+
+    def run(self, stdin: TextIO = sys.stdin):
+        for line in stdin:
+            if not self.handle(line):
+                break
+
+    def set_position(self, args):
+        self.position_valid = False
+        if "moves" in args:
+            index = args.index("moves")
+            args, moves = args[:index], args[index + 1:]
+        else:
+            moves = []
+        if args and args[0] == "fen":
+            pos, red_to_move = from_fen(" ".join(args[1:]))
+        else:
+            pos, red_to_move = from_fen(start_fen)
+        for move in moves:
+            if len(move) != 4 or move[0] not in "abcdefghi" or move[2] not in "abcdefghi" \
+                    or not move[1].isdigit() or not move[3].isdigit():
+                raise ValueError(f"move {move} not recognized")
+            cords = iccs_to_move(move, red_to_move)
+            if cords not in pos.gen_moves():
+                raise ValueError(f"illegal move {move}")
+            pos = pos.move(cords)
+            red_to_move = not red_to_move
+        self.pos, self.red_to_move = pos, red_to_move
+        self.position_valid = True
+        self.ban_moves = set()
+
+    def go(self, args):
+        options = {}
+        for key, value in zip(args, args[1:]):
+            if key in ("depth", "nodes", "time", "movestogo", "increment"):
+                options[key] = int(value)
+        if "time" in options:
+            budget = options["time"] / options.get("movestogo", 20) + options.get("increment", 0)
+            budget = max(10, min(budget, options["time"]))
+            self._deadline = time.perf_counter() + budget / 1000
+        else:
+            self._deadline = None
+        self._max_nodes = options.get("nodes")
+        depth = options.get("depth", 64 if self._deadline or self._max_nodes else self.default_depth)
+        if not self.position_valid:
+            self.send("nobestmove")
+            return
+
+        # 第一层没有完成时返回按 get_move_value 排序的第一个走法
+        best_move = next(iter(self._root_moves(self.pos)), None)
+        for d, score, move in self.iterative_deepening(self.pos, depth):
+            best_move = move
+            self.send(f"info depth {d} score {score} nodes {self.nodes} pv {move_to_iccs(move, self.red_to_move)}")
+        if best_move is None:
+            self.send("nobestmove")
+        else:
+            self.send(f"bestmove {move_to_iccs(best_move, self.red_to_move)}")
+
+    """
+    ==============================
+    search
+    ==============================
+    """
+
+    def gen_moves(self, pos: Position):
+        moves = self.moves_cache.get(pos.board)
+        if moves is None:
+            if len(self.moves_cache) >= self.cache_size:
+                self.moves_cache.clear()
+            moves = sorted(pos.gen_moves(), key=lambda m: get_move_value(pos.board, m), reverse=True)
+            self.moves_cache[pos.board] = moves
+        return moves
+
+    def _root_moves(self, pos: Position):
+        if not pos.player_has_king():
+            return []
+        return [m for m in self.gen_moves(pos) if move_to_iccs(m, self.red_to_move) not in self.ban_moves]
+
+    def iterative_deepening(self, pos: Position, max_depth: int):
+        """
+        迭代加深搜索，每完成一层产生 (深度, 分数, 最佳走法)
+        超时或超过节点数时停止，返回最后一层完整的结果
+        """
+        self.nodes = 0
+        root_moves = self._root_moves(pos)
+        if not root_moves:
+            return
+        score = get_board_value(pos.board)
+        for depth in range(1, max_depth + 1):
+            try:
+                value, move = self.search_root(pos, score, depth, root_moves)
+            except _Timeout:
+                return
+            yield depth, value, move
+            if abs(value) >= MATE_LOWER:
+                return
+
+    def search_root(self, pos, score, depth, root_moves):
+        entry = self.tt.get(pos.board)
+        if entry is not None and entry[3] in root_moves:
+            # 上一层的最佳走法先搜索
+            root_moves = [entry[3]] + [m for m in root_moves if m != entry[3]]
+        alpha, beta = -MATE_VALUE - 1, MATE_VALUE + 1
+        best_move = root_moves[0]
+        for move in root_moves:
+            value = self._child_value(pos, score, move, depth, alpha, beta)
+            if value > alpha:
+                alpha, best_move = value, move
+        self._store(pos.board, depth, alpha, 0, best_move)
+        return alpha, best_move
+
+    def _child_value(self, pos, score, move, depth, alpha, beta):
+        if pos.board[move[1]] == "k":
+            return MATE_VALUE
+        child_score = -(score + get_move_value(pos.board, move))
+        return -self.search(pos.move(move), child_score, depth - 1, -beta, -alpha)
+
+    def search(self, pos: Position, score: int, depth: int, alpha: int, beta: int) -> int:
+        """
+        alpha-beta 搜索，score 为行棋方视角的局面分
+        """
+        self._tick()
+        if depth <= 0:
+            return self.quiesce(pos, score, alpha, beta)
+
+        alpha_orig = alpha
+        entry = self.tt.get(pos.board)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_value, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if tt_flag == 0 or (tt_flag > 0 and tt_value >= beta) or (tt_flag < 0 and tt_value <= alpha):
+                    return tt_value
+
+        moves = self.gen_moves(pos)
+        if not moves:
+            # 无子可动判负
+            return -MATE_VALUE
+        if tt_move is not None and tt_move in moves:
+            moves = [tt_move] + [m for m in moves if m != tt_move]
+
+        best, best_move = -MATE_VALUE - 1, None
+        for move in moves:
+            value = self._child_value(pos, score, move, depth, alpha, beta)
+            if value > best:
+                best, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        # 分数类型: 0 精确值，1 下界，-1 上界
+        flag = 1 if best >= beta else (-1 if best <= alpha_orig else 0)
+        self._store(pos.board, depth, best, flag, best_move)
+        return best
+
+    def quiesce(self, pos: Position, score: int, alpha: int, beta: int) -> int:
+        """
+        静态搜索，只搜索吃子走法
+        """
+        if score >= beta:
+            return score
+        alpha = max(alpha, score)
+        for move in pos.gen_captures():
+            self._tick()
+            if pos.board[move[1]] == "k":
+                return MATE_VALUE
+            child_score = -(score + get_move_value(pos.board, move))
+            value = -self.quiesce(pos.move(move), child_score, -beta, -alpha)
+            if value >= beta:
+                return value
+            alpha = max(alpha, value)
+        return alpha
+
+    def _store(self, board, depth, value, flag, move):
+        if len(self.tt) >= self.cache_size:
+            self.tt.clear()
+        self.tt[board] = (depth, value, flag, move)
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            if self._deadline is not None and time.perf_counter() > self._deadline:
+                raise _Timeout()
+        if self._max_nodes is not None and self.nodes > self._max_nodes:
+            raise _Timeout()
+
+
+def main():
+    engine = UcciEngine()
+    engine.run(sys.stdin)
+
+
+if __name__ == "__main__":
+    main()
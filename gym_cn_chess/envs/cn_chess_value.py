@@ -1,3 +1,7 @@
+import numpy as np
+
+from .cn_chess_logic import piece_code, code_table, square_cord
+
 # P: 兵/卒, N: 马/馬, B: 相/象, R: 车/車, A: 士/仕, C: 炮, K: 帅/将
 piece = {'P': 44, 'N': 108, 'B': 23, 'R': 233, 'A': 23, 'C': 101, 'K': 2500}
 
@@ -118,3 +122,52 @@ def get_move_value(board: str, move: tuple[int, int]):
     if q.islower():
         score += pst[q.upper()][255 - j - 1]
     return score
+
+
+
+# 计算局面的价值 (行棋方视角)
+def get_board_value(board: str):
+    score = 0
+    for i, p in enumerate(board):
+        if p.isupper():
+            score += pst[p][i]
+        elif p.islower():
+            score -= pst[p.upper()][254 - i]
+    return score
+
+
+# pst 的数组版本，按 to_numpy 的棋子编号 (1-7) 索引，编号 0 (空位) 全为 0
+pst_array = np.zeros((8, 256), dtype=np.int32)
+for _p, _code in piece_code.items():
+    if _p.isupper():
+        pst_array[_code] = pst[_p]
+# 按动作使用的格子编号 fil + 9 * rank 索引的位置分
+pst_square = pst_array[:, square_cord]
+# 被吃棋子在对方视角下的位置分
+pst_capture = pst_array[:, 254 - np.array(square_cord)]
+
+
+def get_move_values(board: str, actions) -> np.ndarray:
+    """
+    批量计算走法的价值，结果与 get_move_value 一致
+    actions: 当前局面合法的动作编号 (from * 90 + to)
+    """
+    actions = np.asarray(actions, dtype=np.int64)
+    # 每个格子上的棋子编号
+    codes = code_table[np.frombuffer(board.encode(), dtype=np.uint8)[square_cord]]
+    from_sq, to_sq = np.divmod(actions, 90)
+    p, q = codes[from_sq], codes[to_sq]
+    # Actual move，移动得分；Capture，吃掉棋子得分 (空位和己方棋子对应编号 0)
+    return pst_square[p, to_sq] - pst_square[p, from_sq] + pst_capture[np.maximum(-q, 0), to_sq]
+
+
+def get_all_move_values(board: str, actions, out=None) -> np.ndarray:
+    """
+    与 action_mask 对齐的 8100 维走法价值，非法走法为 0
+    """
+    if out is None:
+        out = np.zeros(90 * 90, dtype=np.float32)
+    else:
+        out.fill(0)
+    out[actions] = get_move_values(board, actions)
+    return out
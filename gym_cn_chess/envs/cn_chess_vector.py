@@ -0,0 +1,182 @@
+# 多进程向量环境
+# 每个子进程负责一组棋盘，观察、action_mask、动作、奖励都放在共享内存中，
+# 进程间的管道只传递命令，不再序列化 8100 维的 action_mask 和 info 字典。
+
+import multiprocessing as mp
+import os
+import traceback
+from typing import Optional, Union
+
+import numpy as np
+from gymnasium.vector import VectorEnv
+
+from .cn_chess_env import CnChessEnv
+
+
+def _buffer_specs(num_envs):
+    # 共享内存: 名称 -> (形状, dtype)
+    return {
+        "observation": ((num_envs, 10, 9), np.float32),
+        "action_mask": ((num_envs, 90 * 90), np.bool_),
+        "action": ((num_envs,), np.int64),
+        "reward": ((num_envs,), np.float32),
+        "terminated": ((num_envs,), np.bool_),
+        "truncated": ((num_envs,), np.bool_),
+        "value": ((num_envs,), np.float32),
+    }
+
+
+def _buffer_views(raws, specs):
+    return {
+        name: np.frombuffer(raws[name], dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+        for name, (shape, dtype) in specs.items()
+    }
+
+
+def _worker(indices, env_kwargs, raws, specs, pipe, parent_pipe):
+    parent_pipe.close()
+    buffers = _buffer_views(raws, specs)
+    envs = [CnChessEnv(**env_kwargs) for _ in indices]
+
+    def write_observation(n, observation):
+        buffers["observation"][n] = observation["observation"]
+        buffers["action_mask"][n] = observation["action_mask"]
+
+    try:
+        while True:
+            command, data = pipe.recv()
+            try:
+                if command == "reset":
+                    for n, env, seed in zip(indices, envs, data):
+                        observation, info = env.reset(seed=seed)
+                        write_observation(n, observation)
+                        buffers["value"][n] = info["value"]
+                    pipe.send((True, None))
+                elif command == "step":
+                    for n, env in zip(indices, envs):
+                        observation, reward, terminated, truncated, info = env.step(int(buffers["action"][n]))
+                        buffers["reward"][n] = reward
+                        buffers["terminated"][n] = terminated
+                        buffers["truncated"][n] = truncated
+                        buffers["value"][n] = info.get("value", 0)
+                        # 自动重置，结束时的观察会被新局面覆盖
+                        if terminated or truncated:
+                            observation, _ = env.reset()
+                        write_observation(n, observation)
+                    pipe.send((True, None))
+                elif command == "close":
+                    pipe.send((True, None))
+                    break
+                else:
+                    raise RuntimeError(f"command {command} not recognized")
+            except Exception:
+                pipe.send((False, traceback.format_exc()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for env in envs:
+            env.close()
+
+
+class CnChessVectorEnv(VectorEnv):
+    """
+    基于共享内存的多进程 CnChessEnv 向量环境
+
+    num_envs 个棋盘平均分给 num_workers 个子进程，子进程直接把观察写入共享内存。
+    结束的棋局在 step 中自动重置 (不保留结束时的观察)，info 只包含 "value"。
+    copy=False 时返回共享内存的视图，下一次 step / reset 会覆盖其中的内容。
+    """
+
+    def __init__(self,
+                 num_envs: int,
+                 num_workers: Optional[int] = None,
+                 env_kwargs: Optional[dict] = None,
+                 copy: bool = True,
+                 context: Optional[str] = None):
+        self.copy = copy
+        self.num_workers = min(num_envs, num_workers or os.cpu_count() or 1)
+        env_kwargs = env_kwargs or {}
+        dummy_env = CnChessEnv(**env_kwargs)
+        super().__init__(num_envs, dummy_env.observation_space, dummy_env.action_space)
+        dummy_env.close()
+
+        ctx = mp.get_context(context)
+        specs = _buffer_specs(num_envs)
+        raws = {
+            name: ctx.RawArray("b", int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            for name, (shape, dtype) in specs.items()
+        }
+        self._buffers = _buffer_views(raws, specs)
+
+        self.parent_pipes, self.processes, self._slices = [], [], []
+        for indices in np.array_split(np.arange(num_envs), self.num_workers):
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                name=f"CnChessVectorEnv-{len(self.processes)}",
+                args=(indices.tolist(), env_kwargs, raws, specs, child_pipe, parent_pipe),
+                daemon=True,
+            )
+            process.start()
+            child_pipe.close()
+            self.parent_pipes.append(parent_pipe)
+            self.processes.append(process)
+            self._slices.append(indices.tolist())
+
+    def _send(self, command, data=None):
+        for pipe, indices in zip(self.parent_pipes, self._slices):
+            pipe.send((command, data(indices) if callable(data) else data))
+
+    def _wait(self):
+        errors = []
+        for pipe in self.parent_pipes:
+            success, message = pipe.recv()
+            if not success:
+                errors.append(message)
+        if errors:
+            raise RuntimeError("worker error:\n" + "\n".join(errors))
+
+    def _observation(self):
+        observation, action_mask = self._buffers["observation"], self._buffers["action_mask"]
+        if self.copy:
+            observation, action_mask = observation.copy(), action_mask.copy()
+        return {"observation": observation, "action_mask": action_mask}
+
+    def reset_async(self, seed: Optional[Union[int, list[int]]] = None, options: Optional[dict] = None):
+        if seed is None:
+            seeds = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seeds = [seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+        self._send("reset", lambda indices: [seeds[n] for n in indices])
+
+    def reset_wait(self, seed=None, options=None):
+        self._wait()
+        return self._observation(), {"value": self._buffers["value"].copy()}
+
+    def step_async(self, actions):
+        self._buffers["action"][:] = actions
+        self._send("step")
+
+    def step_wait(self, **kwargs):
+        self._wait()
+        return (
+            self._observation(),
+            self._buffers["reward"].copy(),
+            self._buffers["terminated"].copy(),
+            self._buffers["truncated"].copy(),
+            {"value": self._buffers["value"].copy()},
+        )
+
+    def close_extras(self, **kwargs):
+        for pipe, process in zip(self.parent_pipes, self.processes):
+            if process.is_alive():
+                try:
+                    pipe.send(("close", None))
+                    pipe.recv()
+                except (BrokenPipeError, EOFError):
+                    pass
+            pipe.close()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,52 @@
+import re
+
+import numpy as np
+import pytest
+from gym_cn_chess.envs import CnChessEnv
+from gym_cn_chess.envs.cn_chess_logic import Position, initial
+
+# 没有棋子的棋盘
+empty_board = re.sub("[A-Za-z]", ".", initial)
+
+
+def play_positions(n_steps=60, seed=0):
+    """随机对局中经过的局面"""
+    rng = np.random.default_rng(seed)
+    env = CnChessEnv()
+    env.reset()
+    positions = [env.pos]
+    for _ in range(n_steps):
+        actions = env.get_possible_actions()
+        if not actions:
+            break
+        _, _, terminated, _, _ = env.step(int(rng.choice(actions)))
+        positions.append(env.pos)
+        if terminated:
+            break
+    return positions
+
+
+def random_position(rng):
+    """帅/将 在九宫内，其余棋子随机摆放"""
+    cells = list(empty_board)
+    squares = rng.permutation(90)
+    cords = [CnChessEnv.str2cord("abcdefghi"[sq % 9] + str(sq // 9)) for sq in squares]
+    palace = [CnChessEnv.str2cord(f + r) for f in "def" for r in "012"]
+    cells[palace[rng.integers(9)]] = "K"
+    cells[254 - palace[rng.integers(9)]] = "k"
+    for cord, p in zip((c for c in cords if cells[c] == "."), rng.choice(list("RNBAPCrnbapc"), 20)):
+        cells[cord] = p
+    return Position("".join(cells))
+
+
+@pytest.fixture(scope="session")
+def game_positions():
+    """三局随机对局中经过的局面"""
+    return [pos for seed in range(3) for pos in play_positions(seed=seed)]
+
+
+@pytest.fixture(scope="session")
+def random_positions():
+    """200 个随机摆放的局面"""
+    rng = np.random.default_rng(0)
+    return [random_position(rng) for _ in range(200)]
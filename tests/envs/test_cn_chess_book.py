@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from gym_cn_chess.envs import CnChessEnv, OpeningBook, OpeningBookWrapper
+from gym_cn_chess.envs import cn_chess_book
+from gym_cn_chess.envs.cn_chess_book import book_dtype, position_hash
+from gym_cn_chess.envs.cn_chess_logic import Position, initial
+
+
+class TestOpeningBook:
+    @pytest.fixture
+    def book(self, tmp_path):
+        """构建一个小的开局库：当头炮 x2，飞相 x1"""
+        games = [
+            ["h2e2", "h2e2", "h0g2"],
+            ["h2e2", "b0c2"],
+            ["c0e2"],
+        ]
+        return OpeningBook.build(games, str(tmp_path / "book.npy"), max_ply=2)
+    
+    def test_build(self, book):
+        """条目按 key 排序，且以 mmap 方式打开"""
+        assert isinstance(book.entries, np.memmap)
+        assert (np.diff(book.keys.astype(np.float64)) >= 0).all()
+        # 初始局面 2 个走法，炮二平五之后 2 个走法，max_ply=2 不收录第三步
+        assert len(book) == 4
+    
+    def test_probe(self, book):
+        """查找初始局面"""
+        actions, weights = book.probe(Position(initial))
+        found = dict(zip(actions.tolist(), weights.tolist()))
+        assert found == {
+            CnChessEnv.move_to_action("h2e2"): 2,
+            CnChessEnv.move_to_action("c0e2"): 1,
+        }
+        assert book.book_move(Position(initial)) == CnChessEnv.move_to_action("h2e2")
+        # 不在库中的局面
+        assert book.book_move(Position(initial).rotate()) is None
+    
+    def test_position_hash(self):
+        """哈希稳定，不同局面结果不同"""
+        assert position_hash(Position(initial)) == position_hash(initial)
+        assert position_hash(initial) != position_hash(Position(initial).rotate())
+    
+    def test_wrapper(self, book):
+        """reset 后自动走完库内走法"""
+        env = OpeningBookWrapper(CnChessEnv(), book, greedy=True)
+        observation, info = env.reset(seed=0)
+        assert info["book_plies"] == 2
+        assert len(env.unwrapped.his) == 3
+        assert observation["action_mask"].any()
+    
+    def test_build_path(self, tmp_path):
+        """路径没有 .npy 后缀时打开 np.save 实际写入的文件"""
+        book = OpeningBook.build([["h2e2"]], str(tmp_path / "book"))
+        assert (tmp_path / "book.npy").exists()
+        assert len(book) == 1
+    
+    def test_build_invalid_game(self, tmp_path):
+        """含不合法走法的棋谱整局跳过"""
+        games = [["h2e2", "e2e9"], ["h2e2", "zz99"], ["a0a0"], ["h2e2"]]
+        book = OpeningBook.build(games, str(tmp_path / "book.npy"))
+        actions, weights = book.probe(Position(initial))
+        assert actions.tolist() == [CnChessEnv.move_to_action("h2e2")]
+        assert weights.tolist() == [1]
+        assert len(book) == 1
+    
+    def test_probe_blocks(self, monkeypatch):
+        """相同的 key 跨越稀疏索引的多个块时也能全部找到"""
+        monkeypatch.setattr(OpeningBook, "index_step", 4)
+        keys = np.sort(np.random.default_rng(0).integers(0, 50, 200).astype(np.uint64))
+        entries = np.zeros(len(keys), dtype=book_dtype)
+        entries["key"] = keys
+        entries["action"] = np.arange(len(keys))
+        book = OpeningBook(entries)
+        for key in range(-1, 52):
+            monkeypatch.setattr(cn_chess_book, "position_hash", lambda position, key=key: key % 2 ** 64)
+            actions, _ = book.probe(initial)
+            assert actions.tolist() == np.flatnonzero(keys == np.uint64(key % 2 ** 64)).tolist()
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from gym_cn_chess.envs import CnChessEnv
+from gym_cn_chess.envs.cn_chess_dataset import iter_games, iter_samples, replay_game, write_shards
+from gym_cn_chess.envs.cn_chess_logic import move_to_iccs
+
+
+def random_game(seed, n_steps=40):
+    """随机对局，返回 (ICCS 棋谱, 观察列表, 动作列表)"""
+    rng = np.random.default_rng(seed)
+    env = CnChessEnv()
+    observation, _ = env.reset()
+    observations, actions, iccs = [], [], []
+    for ply in range(n_steps):
+        action = int(rng.choice(env.get_possible_actions()))
+        move = CnChessEnv.action2move(action)
+        cords = (CnChessEnv.str2cord(move[:2]), CnChessEnv.str2cord(move[2:]))
+        observations.append(observation["observation"])
+        actions.append(action)
+        iccs.append(move_to_iccs(cords, ply % 2 == 0))
+        observation, _, terminated, _, _ = env.step(action)
+        if terminated:
+            break
+    return " ".join(iccs), observations, actions
+
+
+@pytest.fixture(scope="module")
+def games():
+    return [random_game(seed) for seed in range(6)]
+
+
+class TestDataset:
+    def test_replay_game(self, games):
+        """复盘得到的观察和动作与 CnChessEnv.step 一致"""
+        for line, observations, actions in games:
+            samples = replay_game(line + " 1-0")
+            np.testing.assert_array_equal(samples["observation"], np.stack(observations))
+            np.testing.assert_array_equal(samples["action"], actions)
+            assert list(samples["outcome"][:4]) == [1, -1, 1, -1]
+
+    def test_iccs_formats(self):
+        samples = replay_game("H2-E2 H9-G7 0-1")
+        np.testing.assert_array_equal(samples["action"], replay_game("h2e2 h9g7 1-0")["action"])
+        assert list(samples["outcome"]) == [-1, 1]
+
+    def test_illegal_game(self):
+        with pytest.raises(ValueError):
+            replay_game("h2e2 h2e2 1-0")
+        assert [len(s) for s in iter_samples(["h2e2 h2e2 1-0", "h2e2 h9g7 1-0"])] == [2]
+
+    def test_unknown_result(self):
+        """没有结果或结果为 * 的对局默认跳过，不当作和棋"""
+        assert replay_game("h2e2 h9g7") is None
+        assert replay_game("h2e2 h9g7 *") is None
+        assert list(iter_samples(["h2e2 h9g7", "h2e2 h9g7 *"])) == []
+        samples = list(iter_samples(["h2e2 h9g7 *"], unknown_result=0))
+        assert [list(s["outcome"]) for s in samples] == [[0, 0]]
+
+    def test_write_shards(self, games, tmp_path):
+        path = tmp_path / "games.txt"
+        path.write_text("# comment\n\n" + "\n".join(line + " 1/2-1/2" for line, _, _ in games) + "\n")
+        lines = list(iter_games(str(path)))
+        assert len(lines) == len(games)
+
+        paths = write_shards(iter_games(str(path)), str(tmp_path / "shards"), shard_size=50)
+        shards = [np.load(p, mmap_mode="r") for p in paths]
+        n_samples = sum(len(actions) for _, _, actions in games)
+        assert [len(s) for s in shards[:-1]] == [50] * (len(shards) - 1)
+        assert sum(len(s) for s in shards) == n_samples
+        samples = np.concatenate(shards)
+        np.testing.assert_array_equal(samples["action"], np.concatenate([a for _, _, a in games]))
+        assert not samples["outcome"].any()
+
+    def test_process_pool(self, games):
+        lines = [line + " 0-1" for line, _, _ in games] + [games[0][0]]
+        serial = list(iter_samples(lines))
+        pooled = list(iter_samples(lines, processes=2, batch_size=4))
+        assert len(serial) == len(pooled) == len(games)
+        for a, b in zip(serial, pooled):
+            np.testing.assert_array_equal(a, b)
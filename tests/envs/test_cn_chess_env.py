@@ -1,8 +1,12 @@
 from unittest.mock import MagicMock
 import time
+import tracemalloc
 import pytest
 import numpy as np
 from gym_cn_chess.envs import CnChessEnv
+from gym_cn_chess.envs.cn_chess_env import CnChessState
+from gym_cn_chess.envs.cn_chess_logic import from_fen
+from gym_cn_chess.envs.cn_chess_value import get_move_values
 
 
 class TestCnChessEnv:
@@ -40,6 +44,214 @@ class TestCnChessEnv:
         assert isinstance(observation, dict)
         assert isinstance(info, dict)
     
+    def test_stats(self):
+        """测试性能统计"""
+        env = CnChessEnv(stats=True, stats_in_info=True)
+        _, info = env.reset()
+        assert "reset" in info["stats"]
+        for _ in range(3):
+            _, _, _, _, info = env.step(env.get_possible_actions()[0])
+        assert {"step", "step.move", "observation.mask"} <= set(info["stats"])
+        stats = env.stats()
+        assert stats["timings"]["step"]["calls"] == 3
+        assert stats["counters"]["steps"] == 3
+        # step 开始时的合法性检查命中 generate_observation 生成的缓存
+        assert stats["counters"]["cache_hits"] >= 3
+        assert stats["counters"]["moves_generated"] > 0
+        assert stats["repetition_size"] == 3
+        
+        env.reset_stats()
+        assert env.stats()["timings"] == {}
+    
+    def test_stats_disabled(self, env):
+        """默认不统计"""
+        _, _, _, _, info = env.step(env.get_possible_actions()[0])
+        assert "stats" not in info
+        with pytest.raises(RuntimeError):
+            env.stats()
+    
+    def test_reuse_buffers(self):
+        """低分配模式与默认模式结果一致，且重复使用同一块缓冲区"""
+        env, reuse_env = CnChessEnv(), CnChessEnv(reuse_buffers=True)
+        observation, _ = env.reset()
+        reuse_observation, _ = reuse_env.reset()
+        buffers = (reuse_observation["observation"], reuse_observation["action_mask"])
+        kept_history = None
+        for n in range(10):
+            actions = env.get_possible_actions()
+            observation, _, _, _, info = env.step(actions[n % len(actions)])
+            reuse_observation, _, _, _, reuse_info = reuse_env.step(actions[n % len(actions)])
+            assert reuse_observation["observation"] is buffers[0]
+            assert reuse_observation["action_mask"] is buffers[1]
+            np.testing.assert_array_equal(observation["observation"], reuse_observation["observation"])
+            np.testing.assert_array_equal(observation["action_mask"], reuse_observation["action_mask"])
+            assert list(reuse_info["history"]) == info["history"]
+            if n == 1:
+                kept_history, kept_boards = reuse_info["history"], [p.board for p in info["history"]]
+        # 保留的 info["history"] 不随之后的 step / reset 改变
+        reuse_env.reset()
+        assert [p.board for p in kept_history] == kept_boards
+        assert [p.board for p in kept_history[-2:]] == kept_boards[-2:]
+    
+    def test_history_list(self, env):
+        """his 仍然是 list，只保留最近6个局面"""
+        for n in range(8):
+            actions = env.get_possible_actions()
+            env.step(actions[n % len(actions)])
+        assert isinstance(env.his, list)
+        assert len(env.his) == 6
+        assert env.his[-6:] == env.his
+    
+    def test_reuse_buffers_allocation(self):
+        """低分配模式下每步不再分配 8100 维的 action_mask"""
+        env = CnChessEnv(reuse_buffers=True)
+        env.reset()
+        tracemalloc.start()
+        try:
+            for n in range(20):
+                actions = env.get_possible_actions()
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                env.step(actions[n % len(actions)])
+                _, peak = tracemalloc.get_traced_memory()
+                assert peak - current < 90 * 90
+        finally:
+            tracemalloc.stop()
+    
+    def test_state(self, env):
+        """快照恢复后与原棋局一致，快照不受后续走棋影响"""
+        for n in range(6):
+            actions = env.get_possible_actions()
+            env.step(actions[n % len(actions)])
+        state = env.get_state()
+        board_count = dict(state.board_count)
+        expected_observation = env.generate_observation()
+        
+        rollouts = []
+        for k in range(3):
+            env.set_state(state)
+            observation = env.generate_observation()
+            np.testing.assert_array_equal(observation["observation"], expected_observation["observation"])
+            np.testing.assert_array_equal(observation["action_mask"], expected_observation["action_mask"])
+            assert [p.board for p in env.get_history_positions()] == list(state.history)
+            rollout = []
+            for n in range(4):
+                actions = env.get_possible_actions()
+                _, reward, _, _, info = env.step(actions[(n + k) % len(actions)])
+                rollout.append((env.pos.board, reward, info["value"], len(env.board_count)))
+            rollouts.append(rollout)
+            assert dict(state.board_count) == board_count
+        
+        # 相同的走法得到相同的结果
+        env.set_state(state)
+        for n in range(4):
+            actions = env.get_possible_actions()
+            _, reward, _, _, info = env.step(actions[n % len(actions)])
+            assert (env.pos.board, reward, info["value"], len(env.board_count)) == rollouts[0][n]
+    
+    def test_state_repetition(self, env):
+        """重复局面计数随快照恢复"""
+        shuffle = ["b0c2", "b0c2", "c2b0", "c2b0"]
+        for move in shuffle:
+            env.step(env.move_to_action(move))
+        state = env.get_state()
+        assert env.board_count[env.pos.board] == 1
+        for move in shuffle * 2:
+            _, _, terminated, _, _ = env.step(env.move_to_action(move))
+        # 第三次重复
+        assert env.board_count[env.pos.board] == 3
+        assert terminated
+        env.set_state(state)
+        assert env.board_count[env.pos.board] == 1
+    
+    def play_against(self, opponent, seed, n_steps=30):
+        """与内置对手对局，智能体随机走棋"""
+        rng = np.random.default_rng(seed)
+        env = CnChessEnv(opponent=opponent)
+        env.reset(seed=seed)
+        boards = []
+        for _ in range(n_steps):
+            actions = env.get_possible_actions()
+            _, reward, terminated, _, info = env.step(int(rng.choice(actions)))
+            boards.append((env.pos.board, reward, info.get("opponent_action")))
+            if terminated:
+                break
+        return env, boards
+    
+    def test_opponent(self):
+        """一次 step 走两步，轮到智能体行棋，相同种子结果相同"""
+        env, boards = self.play_against("random", seed=0)
+        assert env.current_player == 0
+        assert len(env.his) == min(6, 2 * len(boards) + 1)
+        assert boards == self.play_against("random", seed=0)[1]
+        assert boards != self.play_against("random", seed=1)[1]
+        _, greedy_boards = self.play_against("greedy", seed=0)
+        assert greedy_boards == self.play_against("greedy", seed=0)[1]
+    
+    def test_opponent_reward(self):
+        """对手吃将时奖励为 -1"""
+        pos, _ = from_fen("3k5/9/9/9/9/9/9/9/r8/4K4 w - - 0 1")
+        env = CnChessEnv(opponent="greedy")
+        env.reset(seed=0)
+        env.set_state(CnChessState(pos.board, 0, (False, False), {}, (pos.board,)))
+        _, reward, terminated, _, info = env.step(env.move_to_action("e0e1"))
+        assert terminated and reward == -1
+        assert CnChessEnv.action2move(info["opponent_action"]) == "i8e8"
+    
+    def test_opponent_greedy(self):
+        """greedy 对手选择价值最大的走法"""
+        env = CnChessEnv(opponent="greedy")
+        env.reset(seed=0)
+        _, _, _, _, info = env.step(env.move_to_action("h2e2"))
+        reference = CnChessEnv()
+        reference.step(reference.move_to_action("h2e2"))
+        actions = reference.get_possible_actions()
+        values = get_move_values(reference.pos.board, actions)
+        assert info["opponent_value"] == values.max()
+        assert info["opponent_action"] in [a for a, v in zip(actions, values) if v == values.max()]
+    
+    def test_opponent_invalid_action(self):
+        """对手走法不合法时撤销智能体的一步，历史局面已满 6 个时也能还原"""
+        replies = iter(["b0c2", "c2b0", "b0c2", "a0a0"])
+        env = CnChessEnv(opponent=lambda env: env.move_to_action(next(replies)))
+        env.reset(seed=0)
+        for move in ["b0c2", "c2b0", "b0c2"]:
+            env.step(env.move_to_action(move))
+        assert len(env.his) == 6
+        state = env.get_state()
+        his = list(env.his)
+        with pytest.raises(RuntimeError):
+            env.step(env.move_to_action("h2e2"))
+        assert env.pos.board == state.board
+        assert env.current_player == state.current_player
+        assert env.his == his
+        assert env.board_count == dict(state.board_count)
+    
+    def test_opponent_resign(self):
+        """对手认输时结果和观察仍然是智能体视角"""
+        env = CnChessEnv(opponent=lambda env: env.resign_action())
+        env.reset(seed=0)
+        observation, reward, terminated, _, info = env.step(env.move_to_action("h2e2"))
+        assert terminated and reward == 1
+        assert info["opponent_action"] == env.resign_action()
+        assert env.current_player == 0
+        # 第 9 行为智能体的底线 (车、马、相、仕、帅)
+        assert observation["observation"][9].tolist() == [1, 2, 3, 4, 5, 4, 3, 2, 1]
+        assert observation["action_mask"].any()
+    
+    def test_opponent_stats(self):
+        """对手的一步单独统计"""
+        env = CnChessEnv(opponent="random", stats_in_info=True)
+        env.reset(seed=0)
+        _, _, _, _, info = env.step(env.move_to_action("h2e2"))
+        assert {"step.move", "opponent.choose", "opponent.move"} <= set(info["stats"])
+        stats = env.stats()["timings"]
+        assert stats["step.move"]["calls"] == stats["opponent.move"]["calls"] == 1
+    
+    def test_opponent_unknown(self):
+        with pytest.raises(RuntimeError):
+            CnChessEnv(opponent="minimax")
+    
     def test_render(self, env, monkeypatch):
         """测试渲染方法的行为"""
         env.render_mode = "human"
@@ -0,0 +1,32 @@
+from gym_cn_chess.envs.cn_chess_logic import lva_order, mvv_order
+from gym_cn_chess.envs.cn_chess_value import piece
+
+
+class TestPosition:
+    def test_capture_order(self):
+        """吃子排序与 cn_chess_value.piece 一致"""
+        assert [piece[q.upper()] for q in mvv_order] == sorted(piece.values(), reverse=True)
+        assert [piece[p] for p in lva_order] == sorted(piece.values())
+    
+    def test_gen_captures(self, game_positions, random_positions):
+        """吃子和不吃子的移动合起来与 gen_moves 一致"""
+        positions = game_positions + random_positions
+        n_captures = 0
+        for pos in positions:
+            moves = list(pos.gen_moves())
+            captures = list(pos.gen_captures())
+            quiets = list(pos.gen_quiets())
+            assert sorted(captures) == sorted(m for m in moves if pos.board[m[1]].islower())
+            assert sorted(quiets) == sorted(m for m in moves if pos.board[m[1]] == '.')
+            n_captures += len(captures)
+        assert n_captures > 0
+    
+    def test_mvv_lva(self, random_positions):
+        """先吃价值大的棋子，同一目标先用价值小的棋子"""
+        for pos in random_positions:
+            captures = list(pos.gen_captures())
+            victims = [piece[pos.board[j].upper()] for _, j in captures]
+            assert victims == sorted(victims, reverse=True)
+            keys = [(j, piece[pos.board[i]]) for i, j in captures]
+            for (j0, v0), (j1, v1) in zip(keys, keys[1:]):
+                assert j0 != j1 or v0 <= v1
@@ -0,0 +1,46 @@
+import numpy as np
+from gym_cn_chess.envs import CnChessEnv
+from gym_cn_chess.envs.cn_chess_movegen import batch_action_mask, batch_moves
+
+
+def gen_moves_mask(pos):
+    """Position.gen_moves 生成的走法 mask"""
+    mask = np.zeros(90 * 90, dtype=bool)
+    for i, j in pos.gen_moves():
+        mask[CnChessEnv.move_to_action(CnChessEnv.cord2str(i) + CnChessEnv.cord2str(j))] = True
+    return mask
+
+
+class TestMovegen:
+    def test_game_positions(self, game_positions):
+        """对局中的局面与 gen_moves 一致"""
+        positions = game_positions
+        boards = np.stack([pos.to_numpy() for pos in positions]).astype(np.int8)
+        masks = batch_action_mask(boards)
+        for pos, mask in zip(positions, masks):
+            np.testing.assert_array_equal(mask, gen_moves_mask(pos))
+    
+    def test_random_positions(self, random_positions):
+        """随机摆放的局面与 gen_moves 一致"""
+        positions = random_positions
+        boards = np.stack([pos.to_numpy() for pos in positions]).astype(np.int8)
+        masks = batch_action_mask(boards)
+        for pos, mask in zip(positions, masks):
+            np.testing.assert_array_equal(mask, gen_moves_mask(pos))
+    
+    def test_side(self, game_positions):
+        """side=1 时先转换为黑方视角"""
+        positions = game_positions[:11]
+        boards = np.stack([pos.to_numpy() for pos in positions]).astype(np.int8)
+        # 换算为红方视角的棋盘，黑方行棋的局面 side 为 1
+        side = np.arange(len(positions)) % 2
+        absolute = boards.copy()
+        absolute[side == 1] = -boards[side == 1][:, ::-1, ::-1]
+        np.testing.assert_array_equal(batch_action_mask(absolute, side), batch_action_mask(boards))
+    
+    def test_compact(self, game_positions):
+        """紧凑形式按棋盘下标排序"""
+        boards = np.stack([pos.to_numpy() for pos in game_positions[:6]]).astype(np.int8)
+        batch_index, actions = batch_moves(boards)
+        assert (np.diff(batch_index) >= 0).all()
+        assert np.bincount(batch_index).tolist() == batch_action_mask(boards).sum(axis=1).tolist()
@@ -0,0 +1,46 @@
+import numpy as np
+from gym_cn_chess.envs import CnChessEnv
+from gym_cn_chess.envs.cn_chess_logic import Position
+from gym_cn_chess.envs.cn_chess_symmetry import (
+    mirror_action, mirror_actions, mirror_batch, mirror_board, mirror_masks, mirror_observations,
+)
+
+
+class TestSymmetry:
+    def test_mirror_action(self):
+        """镜像是动作编号上的对合置换"""
+        assert sorted(mirror_action) == list(range(90 * 90))
+        np.testing.assert_array_equal(mirror_action[mirror_action], np.arange(90 * 90))
+        assert mirror_actions(np.array([CnChessEnv.move_to_action("h2e2")]))[0] == CnChessEnv.move_to_action("b2e2")
+    
+    def test_mirror_positions(self, game_positions):
+        """镜像后的观察和 action_mask 与镜像棋盘上直接生成的一致"""
+        env = CnChessEnv()
+        # 帅/将 被吃掉的局面没有合法走法
+        positions = [pos for pos in game_positions if pos.player_has_king()]
+        observations, masks = [], []
+        mirrored_observations, mirrored_masks = [], []
+        for pos in positions:
+            env.pos = pos
+            observation = env.generate_observation()
+            observations.append(observation["observation"])
+            masks.append(observation["action_mask"])
+            env.pos = Position(mirror_board(pos.board))
+            observation = env.generate_observation()
+            mirrored_observations.append(observation["observation"])
+            mirrored_masks.append(observation["action_mask"])
+        
+        actions = np.array([np.flatnonzero(mask)[0] for mask in masks])
+        out_observations, out_masks, out_actions = mirror_batch(np.stack(observations), np.stack(masks), actions)
+        np.testing.assert_array_equal(out_observations, np.stack(mirrored_observations))
+        np.testing.assert_array_equal(out_masks, np.stack(mirrored_masks))
+        assert np.stack(mirrored_masks)[np.arange(len(actions)), out_actions].all()
+    
+    def test_involution(self, game_positions):
+        """两次镜像还原"""
+        observations = np.random.default_rng(0).integers(-7, 8, (5, 10, 9)).astype(np.float32)
+        np.testing.assert_array_equal(mirror_observations(mirror_observations(observations)), observations)
+        masks = np.random.default_rng(0).random((5, 90 * 90)) < 0.01
+        np.testing.assert_array_equal(mirror_masks(mirror_masks(masks)), masks)
+        board = game_positions[5].board
+        assert mirror_board(mirror_board(board)) == board
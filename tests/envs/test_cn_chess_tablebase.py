@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from gym_cn_chess.envs import CnChessEnv, Tablebase, build_tablebase
+from gym_cn_chess.envs.cn_chess_logic import Position
+from gym_cn_chess.envs.cn_chess_tablebase import empty_board
+
+
+def make_position(pieces):
+    """pieces: {走法坐标 (例如 e0): 棋子}，大写为行棋方"""
+    cells = list(empty_board)
+    for cord, p in pieces.items():
+        cells[CnChessEnv.str2cord(cord)] = p
+    return Position("".join(cells))
+
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    """生成 车 对 将 残局库 (同时生成 将 对 将)"""
+    directory = str(tmp_path_factory.mktemp("tablebase"))
+    build_tablebase("KR", "K", directory)
+    return Tablebase(directory)
+
+
+class TestTablebase:
+    def test_files(self, tablebase):
+        """文件以 mmap 方式读取"""
+        assert set(tablebase.configs) == {"KR_K", "K_K"}
+        assert tablebase.max_pieces == 3
+        config = tablebase.configs["KR_K"]
+        assert len(tablebase._table("KR_K")) == config.size == 2 * 9 * 90 * 9
+        assert isinstance(tablebase._table("KR_K"), np.memmap)
+    
+    def test_unrelated_files(self, tablebase):
+        """目录中其他 .npy 文件不当作残局库"""
+        for name in ("shard_00000.npy", "RK_K.npy", "book.npy"):
+            np.save(f"{tablebase.directory}/{name}", np.zeros(1))
+        assert set(Tablebase(tablebase.directory).configs) == {"KR_K", "K_K"}
+    
+    def test_probe(self, tablebase):
+        """对面笑直接吃将，车沉底吃不到将"""
+        assert tablebase.probe(make_position({"e0": "K", "a1": "R", "e9": "k"})) == (1, 1)
+        assert tablebase.probe(make_position({"d0": "K", "e9": "k"})) == (0, 0)
+        # 行棋方只有将，对方有车
+        assert tablebase.probe(make_position({"d0": "K", "e9": "r", "f9": "k"})) is not None
+        # 子力不在残局库中
+        assert tablebase.probe(make_position({"e0": "K", "a1": "N", "e9": "k"})) is None
+    
+    def test_consistency(self, tablebase):
+        """每个局面的结果与其后继局面一致"""
+        config = tablebase.configs["KR_K"]
+        for n, (idx, mover, opponent) in enumerate(config.positions()):
+            if n % 37:
+                continue
+            cells = list(empty_board)
+            for p, sq in mover:
+                cells[sq] = p
+            for p, sq in opponent:
+                cells[254 - sq] = p.lower()
+            pos = Position("".join(cells))
+            wdl, dtm = tablebase.probe(pos)
+            children = []
+            for move in pos.gen_moves():
+                if pos.board[move[1]] == "k":
+                    children.append((-1, 0))
+                else:
+                    children.append(tablebase.probe(pos.move(move)))
+            wins = [d + 1 for w, d in children if w == -1]
+            if wins:
+                assert (wdl, dtm) == (1, min(wins))
+            elif any(w == 0 for w, _ in children):
+                assert (wdl, dtm) == (0, 0)
+            else:
+                assert (wdl, dtm) == (-1, max((d for _, d in children), default=-1) + 1)
+    
+    def test_env_adjudication(self, tablebase):
+        """进入残局库后 step 直接结束"""
+        env = CnChessEnv(tablebase=tablebase)
+        env.pos = make_position({"d0": "K", "a1": "R", "e9": "k"})
+        action = env.get_possible_actions()[0]
+        _, reward, terminated, _, info = env.step(action)
+        assert terminated
+        assert reward == -info["tablebase"][0]
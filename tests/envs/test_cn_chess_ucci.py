@@ -0,0 +1,110 @@
+import io
+
+import pytest
+from gym_cn_chess.envs.cn_chess_logic import initial, start_fen, from_fen, iccs_to_move, move_to_iccs
+from gym_cn_chess.envs.cn_chess_ucci import UcciEngine
+
+
+@pytest.fixture
+def engine():
+    return UcciEngine(out=io.StringIO())
+
+
+def output(engine):
+    lines = engine.out.getvalue().splitlines()
+    engine.out.seek(0)
+    engine.out.truncate()
+    return lines
+
+
+class TestFen:
+    def test_start_fen(self):
+        pos, red_to_move = from_fen(start_fen)
+        assert pos.board == initial
+        assert red_to_move
+
+    def test_black_to_move(self):
+        """黑方行棋时转换为黑方视角，ICCS 坐标仍然是红方视角"""
+        pos, red_to_move = from_fen(start_fen)
+        pos = pos.move(iccs_to_move("h2e2", red_to_move))
+        fen = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C4/9/RNBAKABNR b - - 0 1"
+        black, red_to_move = from_fen(fen)
+        assert not red_to_move
+        assert black.board == pos.board
+        move = iccs_to_move("h9g7", red_to_move)
+        assert move in list(black.gen_moves())
+        assert move_to_iccs(move, red_to_move) == "h9g7"
+
+
+class TestUcciEngine:
+    def test_handshake(self, engine):
+        assert engine.handle("ucci")
+        assert output(engine) == ["id name gym_cn_chess", "id author theone", "ucciok"]
+        engine.handle("isready")
+        assert output(engine) == ["readyok"]
+        assert not engine.handle("quit")
+        assert output(engine) == ["bye"]
+
+    def test_go_depth(self, engine):
+        engine.handle("position startpos moves h2e2 h9g7")
+        engine.handle("go depth 2")
+        lines = output(engine)
+        assert [line.split()[2] for line in lines[:-1]] == ["1", "2"]
+        bestmove = lines[-1].split()
+        assert bestmove[0] == "bestmove"
+        assert iccs_to_move(bestmove[1], engine.red_to_move) in list(engine.pos.gen_moves())
+
+    def test_capture_king(self, engine):
+        """能吃将时直接吃将"""
+        engine.handle("position fen 4k4/9/9/9/9/9/9/9/4R4/3K5 w - - 0 1")
+        engine.handle("go depth 3")
+        assert output(engine)[-1] == "bestmove e1e9"
+
+    def test_banmoves(self, engine):
+        engine.handle("position fen 4k4/9/9/9/9/9/9/9/4R4/3K5 w - - 0 1")
+        engine.handle("banmoves e1e9")
+        engine.handle("go depth 1")
+        assert output(engine)[-1] != "bestmove e1e9"
+
+    def test_go_time(self, engine):
+        """时间用完时返回最后一层完整搜索的结果，缓存在命令之间保留"""
+        engine.handle("position startpos")
+        engine.handle("go time 200")
+        assert output(engine)[-1].startswith("bestmove")
+        assert engine.tt and engine.moves_cache
+        engine.handle("go nodes 500")
+        assert output(engine)[-1].startswith("bestmove")
+
+    def test_bad_commands(self, engine):
+        """命令有误时报告错误，进程继续运行；position 有误时 go 返回 nobestmove"""
+        engine.handle("position startpos moves h2e2")
+        assert engine.handle("go depth x")
+        assert output(engine)[-1].startswith("info string error")
+        for line in ["position fen bad", "position startpos moves h2e2 h2e2",
+                     "position startpos moves z9z9", "position startpos moves h2e2 zz"]:
+            engine.handle("position startpos moves h2e2")
+            assert engine.handle(line)
+            assert output(engine)[-1].startswith("info string error")
+            engine.handle("go time 500")
+            assert output(engine) == ["nobestmove"]
+        engine.handle("isready")
+        assert output(engine) == ["readyok"]
+        # 收到正确的 position 后恢复
+        engine.handle("position startpos moves h2e2")
+        engine.handle("go depth 1")
+        assert output(engine)[-1].startswith("bestmove")
+
+    def test_go_nodes_fallback(self, engine):
+        """第一层没有完成时也返回合法走法"""
+        engine.handle("position startpos")
+        engine.handle("go nodes 10")
+        bestmove = output(engine)[-1].split()
+        assert bestmove[0] == "bestmove"
+        assert iccs_to_move(bestmove[1], engine.red_to_move) in list(engine.pos.gen_moves())
+
+    def test_run(self):
+        out = io.StringIO()
+        UcciEngine(out=out).run(io.StringIO("ucci\nposition startpos\ngo depth 1\nquit\nisready\n"))
+        lines = out.getvalue().splitlines()
+        assert lines[-1] == "bye"
+        assert "readyok" not in lines
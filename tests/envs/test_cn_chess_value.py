@@ -0,0 +1,43 @@
+import numpy as np
+from gym_cn_chess.envs import CnChessEnv
+from gym_cn_chess.envs.cn_chess_value import get_all_move_values, get_move_value, get_move_values
+
+
+class TestMoveValues:
+    def test_get_move_values(self):
+        """批量计算的结果与 get_move_value 一致 (包含吃子)"""
+        rng = np.random.default_rng(0)
+        env = CnChessEnv()
+        env.reset()
+        n_captures = 0
+        for _ in range(80):
+            board = env.pos.board
+            moves = list(env.pos.gen_moves())
+            actions = env.get_possible_actions()
+            expected = [get_move_value(board, move) for move in moves]
+            np.testing.assert_array_equal(get_move_values(board, actions), expected)
+            n_captures += sum(board[j].islower() for _, j in moves)
+            _, _, terminated, _, _ = env.step(int(rng.choice(actions)))
+            if terminated:
+                env.reset()
+        assert n_captures > 0
+    
+    def test_get_all_move_values(self):
+        """与 action_mask 对齐"""
+        env = CnChessEnv()
+        observation, _ = env.reset()
+        actions = env.get_possible_actions()
+        values = get_all_move_values(env.pos.board, actions)
+        assert values.shape == (90 * 90,)
+        assert (values[~observation["action_mask"]] == 0).all()
+        action = CnChessEnv.move_to_action("h2e2")
+        assert values[action] == get_move_value(env.pos.board, (CnChessEnv.str2cord("h2"), CnChessEnv.str2cord("e2")))
+    
+    def test_env_info(self):
+        """move_values=True 时 info 中给出新局面所有走法的价值"""
+        env = CnChessEnv(move_values=True)
+        _, info = env.reset()
+        assert info["move_values"].shape == (90 * 90,)
+        observation, _, _, _, info = env.step(env.get_possible_actions()[0])
+        np.testing.assert_array_equal(
+            info["move_values"], get_all_move_values(env.pos.board, np.flatnonzero(observation["action_mask"])))
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from gym_cn_chess.envs import CnChessEnv, CnChessVectorEnv
+
+
+class TestCnChessVectorEnv:
+    @pytest.fixture
+    def envs(self):
+        """4 个棋盘，2 个子进程"""
+        envs = CnChessVectorEnv(4, num_workers=2)
+        yield envs
+        envs.close()
+    
+    def test_spaces(self, envs):
+        """观察空间按 num_envs 批量化"""
+        assert envs.num_workers == 2
+        assert envs.observation_space["observation"].shape == (4, 10, 9)
+        assert envs.observation_space["action_mask"].shape == (4, 90 * 90)
+    
+    def test_step(self, envs):
+        """与单进程环境的结果一致"""
+        observation, _ = envs.reset(seed=0)
+        serial = [CnChessEnv() for _ in range(4)]
+        for env in serial:
+            env.reset()
+        for _ in range(3):
+            # 每个棋盘走不同的第 n 个合法走法
+            actions = np.array([np.flatnonzero(mask)[n] for n, mask in enumerate(observation["action_mask"])])
+            observation, reward, terminated, truncated, info = envs.step(actions)
+            for n, env in enumerate(serial):
+                expected, expected_reward, _, _, expected_info = env.step(int(actions[n]))
+                np.testing.assert_array_equal(observation["observation"][n], expected["observation"])
+                np.testing.assert_array_equal(observation["action_mask"][n], expected["action_mask"])
+                assert reward[n] == expected_reward
+                assert info["value"][n] == expected_info["value"]
+            assert not terminated.any() and not truncated.any()
+    
+    def test_worker_error(self, envs):
+        """子进程中的非法走法会在主进程抛出"""
+        envs.reset()
+        with pytest.raises(RuntimeError):
+            envs.step(np.zeros(4, dtype=np.int64))